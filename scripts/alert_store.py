@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+alert_store.py
+Append-only, versioned store of colour-alert runs, kept alongside the
+I3_Color_Alerts_YYYYMMDD_HHMM.csv snapshots.
+
+Every run of a pair builder appends its table as one run.  Rows are kept
+column by column in raw little-endian files that only ever grow, and a small
+JSON run index records where each run starts:
+
+    I3_Color_Alerts.store/
+        runs.json        columns + dtypes, label tables, one entry per run:
+                         run_id, tag, created, source_sha256, first_row, rows, sha256
+        run.u4           run that wrote the row
+        date.i8          ns since 1970-01-01 UTC
+        pair.u2          code into the 'pair' label table
+        color.f8, ...    plain columns
+
+The shell pipeline (run logs, proof bundles, cleanup) still globs
+I3_Color_Alerts_<tag>.csv; export() writes a run in that form, and the pair
+builders export every run they append.  Readers go through load_latest(),
+which falls back to the newest snapshot CSV while the store has no runs yet
+(a fresh checkout, or snapshots not migrated with `import`).
+
+Loading a run is one offset read per column (O(rows in that run)), so the
+latest run and any historical one are equally cheap, and comparing runs never
+re-reads every snapshot.  A run whose content is identical to an earlier one
+(the usual case for re-runs on an unchanged I3.txt) is recorded in the index
+only and shares that run's rows.  The index is written after the column data
+(write-then-rename), so an interrupted append leaves the previous runs intact
+and its partial rows are overwritten by the next append.
+
+Usage:
+    from alert_store import AlertStore
+    store = AlertStore()                          # ./I3_Color_Alerts.store
+    run_id = store.append(pairs, tag="20251123_1831", source_sha256=sha_in)
+    latest = store.load()                         # date / pair / color ...
+    older = store.load("20251105_1757")           # by tag or run_id
+    both = store.history([3, run_id])             # with a leading run_id column
+    color, source = load_latest()                 # latest run, else newest snapshot CSV
+
+    python alert_store.py import I3_Color_Alerts_*.csv    # migrate snapshots
+    python alert_store.py list
+    python alert_store.py show [RUN]
+    python alert_store.py export [RUN] [--out FILE]       # → I3_Color_Alerts_<tag>.csv
+
+Author: Salah-Eddin Gherbi
+"""
+
+import hashlib
+import re
+from glob import glob
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mpc_cache import _read_json, _write_json
+
+ALERT_STORE = Path("I3_Color_Alerts.store")
+INDEX = "runs.json"
+STORE_VERSION = 1
+RUN_DTYPE = np.dtype("<u4")
+LABEL_DTYPE = np.dtype("<u2")
+
+class AlertStore:
+    """Run index + append-only column files under one directory."""
+
+    def __init__(self, path=ALERT_STORE):
+        self.path = Path(path)
+        self.index = _read_json(self.path / INDEX) or {
+            "version": STORE_VERSION, "columns": [], "labels": {}, "runs": []}
+        if self.index.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.path} is alert-store version {self.index.get('version')}, "
+                             f"expected {STORE_VERSION}")
+
+    # ---------------- run index ----------------
+    @property
+    def n_rows(self) -> int:
+        """Rows committed to the column files (shared runs add none)."""
+        runs = self.index["runs"]
+        return max((r["first_row"] + r["rows"] for r in runs), default=0)
+
+    def runs(self) -> pd.DataFrame:
+        cols = ["run_id", "tag", "created", "source_sha256", "first_row", "rows", "sha256"]
+        return pd.DataFrame(self.index["runs"], columns=cols)
+
+    def run(self, run=None) -> dict:
+        """Index entry of a run: None = latest, int = run_id (negative counts back), str = tag."""
+        runs = self.index["runs"]
+        if not runs:
+            raise FileNotFoundError(f"No colour-alert runs in {self.path}")
+        if run is None:
+            return runs[-1]
+        if isinstance(run, (int, np.integer)):
+            if run < 0:
+                if -run > len(runs):
+                    raise KeyError(f"Only {len(runs)} runs in {self.path}")
+                return runs[run]
+            for r in runs:
+                if r["run_id"] == run:
+                    return r
+            raise KeyError(f"No run {run} in {self.path}")
+        for r in reversed(runs):
+            if r["tag"] == run:
+                return r
+        raise KeyError(f"No run tagged {run!r} in {self.path}")
+
+    # ---------------- column files ----------------
+    def _file(self, spec) -> Path:
+        return self.path / f"{spec['name']}.{np.dtype(spec['dtype']).kind}{np.dtype(spec['dtype']).itemsize}"
+
+    def _specs(self):
+        return [{"name": "run", "dtype": RUN_DTYPE.str}] + self.index["columns"]
+
+    def _encode(self, df: pd.DataFrame) -> dict:
+        """DataFrame → {column: little-endian array}; label columns extend their tables."""
+        if not self.index["columns"]:
+            self.index["columns"] = [_column_spec(name, df[name]) for name in df.columns]
+        names = [c["name"] for c in self.index["columns"]]
+        if list(df.columns) != names:
+            raise ValueError(f"columns {list(df.columns)} do not match the store's {names}")
+
+        arrays = {}
+        for spec in self.index["columns"]:
+            col = df[spec["name"]]
+            if spec["kind"] == "label":
+                table = self.index["labels"].setdefault(spec["name"], [])
+                values = col.astype(str).to_numpy()
+                known = set(table)
+                table.extend(v for v in pd.unique(values) if v not in known)
+                if len(table) > np.iinfo(LABEL_DTYPE).max:
+                    raise ValueError(f"too many distinct {spec['name']} labels")
+                codes = {v: i for i, v in enumerate(table)}
+                arrays[spec["name"]] = np.array([codes[v] for v in values], dtype=LABEL_DTYPE)
+            elif spec["kind"] == "datetime":
+                ts = pd.to_datetime(col, utc=True)
+                arrays[spec["name"]] = ts.dt.tz_localize(None).to_numpy().astype("datetime64[ns]").view("<i8")
+            else:
+                arrays[spec["name"]] = col.to_numpy(dtype=spec["dtype"])
+        return arrays
+
+    def _decode(self, arrays: dict) -> pd.DataFrame:
+        data = {}
+        for spec in self.index["columns"]:
+            a = arrays[spec["name"]]
+            if spec["kind"] == "label":
+                labels = self.index["labels"].get(spec["name"], [])
+                data[spec["name"]] = pd.Categorical.from_codes(a.astype(np.int64), categories=labels).astype(str)
+            elif spec["kind"] == "datetime":
+                data[spec["name"]] = pd.DatetimeIndex(a.view("datetime64[ns]")).tz_localize("UTC")
+            else:
+                data[spec["name"]] = a
+        return pd.DataFrame(data)
+
+    def _read(self, spec, first_row, rows) -> np.ndarray:
+        dtype = np.dtype(spec["dtype"])
+        return np.fromfile(self._file(spec), dtype=dtype, count=rows, offset=first_row * dtype.itemsize)
+
+    # ---------------- append ----------------
+    def append(self, df: pd.DataFrame, tag=None, source_sha256=None) -> int:
+        """Add `df` as a new run and return its run_id."""
+        arrays = self._encode(df)
+        digest = hashlib.sha256()
+        for spec in self.index["columns"]:
+            digest.update(arrays[spec["name"]].tobytes())
+        digest = digest.hexdigest()
+
+        runs = self.index["runs"]
+        run_id = runs[-1]["run_id"] + 1 if runs else 1
+        same = next((r for r in runs if r["sha256"] == digest), None)
+        if same is not None:
+            first_row = same["first_row"]                     # identical content: share its rows
+        else:
+            first_row = self.n_rows
+            arrays["run"] = np.full(len(df), run_id, dtype=RUN_DTYPE)
+            self.path.mkdir(parents=True, exist_ok=True)
+            for spec in self._specs():
+                a = arrays[spec["name"]]
+                with open(self._file(spec), "ab") as f:
+                    f.truncate(first_row * a.itemsize)          # drop rows of an interrupted append
+                    f.write(a.tobytes())
+
+        runs.append({
+            "run_id": run_id,
+            "tag": tag or datetime.now(timezone.utc).strftime("%Y%m%d_%H%M"),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source_sha256": source_sha256,
+            "first_row": first_row,
+            "rows": len(df),
+            "sha256": digest,
+        })
+        _write_json(self.path / INDEX, self.index)
+        return run_id
+
+    # ---------------- load ----------------
+    def load(self, run=None) -> pd.DataFrame:
+        """One run's table (latest by default), in the order it was appended."""
+        r = self.run(run)
+        return self._decode({spec["name"]: self._read(spec, r["first_row"], r["rows"])
+                             for spec in self.index["columns"]})
+
+    def export(self, run=None, path=None) -> Path:
+        """Write one run as the I3_Color_Alerts_<tag>.csv snapshot the shell pipeline reads."""
+        r = self.run(run)
+        path = Path(path or f"I3_Color_Alerts_{r['tag']}.csv")
+        self.load(r["run_id"]).to_csv(path, index=False)
+        return path
+
+    def history(self, runs=None) -> pd.DataFrame:
+        """Several runs (default: all) stacked, with a leading run_id column."""
+        picked = [self.run(r) for r in runs] if runs is not None else self.index["runs"]
+        parts = [self.load(r["run_id"]) for r in picked]
+        if not parts:
+            return pd.DataFrame(columns=["run_id"] + [c["name"] for c in self.index["columns"]])
+        out = pd.concat(parts, ignore_index=True)
+        out.insert(0, "run_id", np.repeat([r["run_id"] for r in picked], [r["rows"] for r in picked]))
+        return out
+
+    def nbytes(self) -> int:
+        return sum(p.stat().st_size for p in self.path.iterdir() if p.is_file()) if self.path.is_dir() else 0
+
+def _column_spec(name, col: pd.Series) -> dict:
+    if isinstance(col.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(col.dtype):
+        return {"name": name, "kind": "datetime", "dtype": "<i8"}
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return {"name": name, "kind": "array", "dtype": "|b1"}
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return {"name": name, "kind": "array", "dtype": "<i8"}
+    if pd.api.types.is_float_dtype(col.dtype):
+        return {"name": name, "kind": "array", "dtype": "<f8"}
+    return {"name": name, "kind": "label", "dtype": LABEL_DTYPE.str}
+
+def snapshot_tag(path) -> str:
+    """YYYYMMDD_HHMM of an I3_Color_Alerts_<tag>.csv name (else the file stem)."""
+    m = re.search(r"(\d{8}_\d{4})", Path(path).name)
+    return m.group(1) if m else Path(path).stem
+
+def load_latest(path=ALERT_STORE, pattern="I3_Color_Alerts_*.csv"):
+    """(table, source) of the latest colour-alert run; the newest snapshot CSV if the store is empty."""
+    store = AlertStore(path)
+    if store.index["runs"]:
+        latest = store.run()
+        return store.load(latest["run_id"]), f"run {latest['run_id']} ({latest['tag']}) from {store.path}"
+    snapshots = sorted(glob(pattern), key=snapshot_tag)
+    if not snapshots:
+        raise FileNotFoundError(f"No colour-alert runs in {store.path} and no {pattern} files found.")
+    return pd.read_csv(snapshots[-1], parse_dates=["date"]), snapshots[-1]
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Append-only colour-alert run store.")
+    p.add_argument("command", choices=["import", "list", "show", "export"])
+    p.add_argument("args", nargs="*", help="snapshot CSVs (import) or a run id / tag (show, export)")
+    p.add_argument("--store", default=str(ALERT_STORE))
+    p.add_argument("--out", default=None, help="export: output CSV (default I3_Color_Alerts_<tag>.csv)")
+    args = p.parse_args()
+
+    store = AlertStore(args.store)
+    if args.command == "import":
+        csv_bytes = 0
+        for path in sorted(args.args, key=snapshot_tag):
+            df = pd.read_csv(path, parse_dates=["date"])
+            run_id = store.append(df, tag=snapshot_tag(path))
+            csv_bytes += Path(path).stat().st_size
+            print(f"📥 {path} → run {run_id} ({len(df)} rows)")
+        print(f"💾 {len(args.args)} snapshots: {csv_bytes / 1e3:.1f} kB of CSV → "
+              f"{store.nbytes() / 1e3:.1f} kB in {store.path}")
+    elif args.command == "list":
+        print(store.runs().drop(columns=["sha256"]).to_string(index=False))
+    else:
+        run = args.args[0] if args.args and args.args[0] != "latest" else None
+        if run is not None and re.fullmatch(r"-?\d+", run):
+            run = int(run)
+        if args.command == "show":
+            print(store.load(run).to_string(index=False))
+        else:
+            print(f"📝 Exported run {store.run(run)['run_id']} → {store.export(run, args.out)}")
@@ -9,7 +9,7 @@ Author: Salah-Eddin Gherbi
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from datetime import datetime
+from mpc_parser import mpc_date_to_timestamp
 
 # ------------------------------------------------------------
 # Configuration
@@ -40,9 +40,9 @@ def parse_mpc_photometry(path):
             if not magm:
                 continue
             mag = float(magm.group(1))
-            date = pd.Timestamp(2025, month, int(dayf), tz="UTC") + pd.to_timedelta((dayf % 1) * 24, unit="h")
-            data.append({"date": date, "mag": mag})
+            data.append({"month": month, "day": dayf, "mag": mag})
     df = pd.DataFrame(data)
+    df.insert(0, "date", mpc_date_to_timestamp(2025, df.pop("month"), df.pop("day")))
     df = df.sort_values("date").reset_index(drop=True)
     return df
 
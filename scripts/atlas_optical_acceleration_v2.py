@@ -8,8 +8,10 @@ Author: Salah-Eddin Gherbi
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import re
-import glob
+
+from alert_store import load_latest
+from mpc_parser import NAT, NS_PER_DAY
+from obs_store import ObsStore
 
 # ------------------------------------------------------------
 # Constants
@@ -22,70 +24,30 @@ A1_MS2 = A1_NGA * 1.496e11 / (86400**2)
 A1_MS2_MM = A1_MS2 * 1e3  # mm/s²
 
 # ------------------------------------------------------------
-# Parse MPC photometry (IMPROVED VERSION)
+# Load MPC photometry (typed observation store)
 # ------------------------------------------------------------
 
-rows = []
-with open(MPC_FILE) as f:
-    for line in f:
-        if not line.startswith("0003I"):
-            continue
-        m = re.search(r"2025\s(\d{2})\s(\d{2}\.\d+)", line)
-        if not m:
-            continue
-        month = int(m.group(1))
-        dayf = float(m.group(2))
-        
-        # IMPROVED MAGNITUDE PARSING WITH VALIDATION
-        mag = None
-        parts = line.split()
-        
-        if len(parts) >= 2:
-            potential_mag = parts[-2]
-            
-            # Check if this looks like a real magnitude (not coordinates)
-            if (potential_mag.replace('.', '').isdigit() and 
-                len(potential_mag) <= 5 and  # Magnitudes are usually 4-5 chars like "12.3"
-                float(potential_mag) >= 8 and  # Realistic comet magnitudes
-                float(potential_mag) <= 20):
-                
-                mag = float(potential_mag)
-            
-            # Additional check: if the "magnitude" looks like coordinates, discard it
-            elif (potential_mag.replace('.', '').isdigit() and 
-                  (float(potential_mag) > 20 or float(potential_mag) < 8)):
-                
-                # This is likely coordinates, not magnitude - check if magnitude is actually missing
-                # Look for pattern: coordinates then immediately observatory code = missing magnitude
-                obs_code = parts[-1]
-                if (len(obs_code) >= 7 and obs_code[0].isalpha() and 
-                    any(c.isdigit() for c in obs_code)):
-                    
-                    # Pattern: [coordinates] [observatory] with no magnitude in between
-                    # This means magnitude is missing
-                    mag = None
-
-        day_int = int(dayf)
-        frac_day = dayf - day_int
-        date = pd.Timestamp(2025, month, day_int, tz="UTC") + pd.to_timedelta(frac_day * 24, unit="h")
-        rows.append({"date": date, "mag": mag})
-
-df = pd.DataFrame(rows)
-df = df.sort_values("date").reset_index(drop=True)
-print(f"✅ Parsed {len(df)} MPC observations ({df['date'].min().date()} → {df['date'].max().date()})")
+store = ObsStore.from_mpc_file(MPC_FILE, obj="0003I")
+dates = store.dates()
+print(f"✅ Parsed {len(store)} MPC observations ({dates.min().date()} → {dates.max().date()})")
+
+# MAGNITUDE VALIDATION: fixed-width cols 66–70 hold the magnitude; keep only
+# realistic comet magnitudes, anything else is treated as missing
+has_mag = (store.mag >= 8) & (store.mag <= 20) & (store.t != NAT)
 
 # ------------------------------------------------------------
 # Bin data by day (avoid minute-level dt explosions)
 # ------------------------------------------------------------
-df["day"] = df["date"].dt.floor("D")
 
 # 🎯 DEBUG: Check what data we're actually grouping
-print(f"🔍 Before grouping: {len(df)} total, {df['mag'].notna().sum()} with magnitudes")
-print(f"📅 Date range with magnitudes: {df[df['mag'].notna()]['date'].min()} → {df[df['mag'].notna()]['date'].max()}")
+print(f"🔍 Before grouping: {len(store)} total, {has_mag.sum()} with magnitudes")
+print(f"📅 Date range with magnitudes: {dates[has_mag].min()} → {dates[has_mag].max()}")
 
-df_with_mag = df[df['mag'].notna()].copy()
-df_daily = df_with_mag.groupby("day")["mag"].mean().reset_index()
-df_daily.rename(columns={"day": "date"}, inplace=True)
+days, day_idx = np.unique(store.night[has_mag], return_inverse=True)
+df_daily = pd.DataFrame({
+    "date": pd.to_datetime(days * NS_PER_DAY, utc=True),
+    "mag": np.bincount(day_idx, weights=store.mag64[has_mag]) / np.bincount(day_idx),
+})
 
 # Compute optical proxies
 df_daily["inv_mag"] = 1 / df_daily["mag"]
@@ -157,17 +119,9 @@ ax1.text(
 # Optional overlay: color index correlation (e.g., r–o or g–o)
 # ------------------------------------------------------------
 try:
-    # Automatically find the most recent colour-alert CSV
-    alert_files = sorted(glob.glob("I3_Color_Alerts_*.csv"))
-
-    if len(alert_files) == 0:
-        raise FileNotFoundError("No I3_Color_Alerts_*.csv files found.")
-
-    color_file = alert_files[-1]  # Latest timestamped file
-
-    print(f"🎨 Using colour-alert file: {color_file}")
-
-    color_df = pd.read_csv(color_file, parse_dates=["date"])
+    # Latest colour-alert run (store), else the newest I3_Color_Alerts_*.csv
+    color_df, source = load_latest()
+    print(f"🎨 Using colour alerts: {source}")
 
     # Keep only relevant pairs
     color_df = color_df[color_df["pair"].isin(["r-o", "g-o"])]
@@ -9,9 +9,11 @@ Repository: https://github.com/salahealer9/salah-gherbi-3I_ATLAS_Anomaly_2025
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import glob
 
 from matplotlib.dates import DateFormatter
+
+from alert_store import load_latest
+
 POST_DAYS = 12          # how many days after perihelion to shade
 N_LABEL_LAST = 3        # annotate last N post-perihelion points
 
@@ -36,15 +38,9 @@ def annotate_last(ax, df, xcol, ycol, n=N_LABEL_LAST, fmt="%b-%d"):
 # === Load color index data ===
 
 try:
-    # Automatically pick the latest colour-alert CSV
-    alert_files = sorted(glob.glob("I3_Color_Alerts_*.csv"))
-    if len(alert_files) == 0:
-        raise FileNotFoundError("No I3_Color_Alerts_*.csv files found in current directory.")
-
-    color_file = alert_files[-1]  # most recent file
-    print(f"🎨 Using colour-alert file: {color_file}")
-
-    color = pd.read_csv(color_file, parse_dates=["date"])
+    # Latest colour-alert run (store), else the newest I3_Color_Alerts_*.csv
+    color, source = load_latest()
+    print(f"🎨 Using colour alerts: {source}")
     color = color[color["pair"].isin(["g-o", "r-o"])]
 
     color["color_smooth"] = (
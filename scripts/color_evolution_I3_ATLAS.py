@@ -17,9 +17,8 @@ Version: 1.0 — November 2025
 
 import re
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
-from datetime import datetime
+from mpc_parser import mpc_date_to_timestamp
 
 # ----------------------------------------------------------
 # Step 1 — Parse MPC file
@@ -37,17 +36,11 @@ with open(fname, "r") as f:
         m = pattern.search(line)
         if m:
             date_str, mag, filt = m.groups()
-            try:
-                # convert to datetime
-                parts = date_str.strip().split()
-                y, mth, dfrac = int(parts[0]), int(parts[1]), float(parts[2])
-                jd_base = datetime(y, mth, int(dfrac))
-                date = jd_base + pd.to_timedelta((dfrac % 1) * 24, unit='h')
-            except Exception:
-                date = np.nan
-            records.append((date, float(mag), filt))
+            y, mth, dfrac = date_str.split()
+            records.append((int(y), int(mth), float(dfrac), float(mag), filt))
 
-df = pd.DataFrame(records, columns=["date", "mag", "filter"])
+df = pd.DataFrame(records, columns=["year", "month", "day", "mag", "filter"])
+df.insert(0, "date", mpc_date_to_timestamp(df.pop("year"), df.pop("month"), df.pop("day"), tz=None))
 df = df.dropna()
 df["month"] = df["date"].dt.to_period("M")
 print(f"✅ Parsed {len(df)} photometric points across {df['filter'].nunique()} filters.")
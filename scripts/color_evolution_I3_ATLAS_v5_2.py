@@ -11,6 +11,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import re
 
+from mpc_parser import mpc_date_to_timestamp
+
 # ----------------------------------------------------------
 # Step 1 — Parse MPC file
 # ----------------------------------------------------------
@@ -41,15 +43,7 @@ for line in lines:
 df = pd.DataFrame(data)
 
 # --- Convert MPC fractional days to proper datetime ---
-def fractional_day_to_datetime(month, day_frac):
-    day_int = int(day_frac)
-    frac = day_frac - day_int
-    base_date = pd.Timestamp(f"2025-{month:02d}-{day_int:02d}")
-    return base_date + pd.to_timedelta(frac * 24, unit="h")
-
-df["date_night"] = [
-    fractional_day_to_datetime(m, d) for m, d in zip(df["month"], df["day"])
-]
+df["date_night"] = mpc_date_to_timestamp(2025, df["month"], df["day"], tz=None)
 df = df.dropna(subset=["date_night"])
 
 # ----------------------------------------------------------
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+color_pairs.py
+Colour-pair engine over a dense night × band matrix of nightly magnitudes.
+
+Every pair builder in the repo does the same thing: for each centre night,
+take the nightly magnitudes of bands f1 and f2 within ±window nights and
+difference their means.  Instead of re-masking a nightly table per centre and
+per pair, the nightly per-band sums are pivoted once into night × band
+arrays (BandMatrix).  A centre's window is then one [lo, hi) row range shared
+by every band, found by binary search; night and observation counts are
+column-wise prefix sums; the window magnitude sums of all centres and all
+bands are accumulated together, one window row at a time (at most
+2·window+1 vectorized steps).  Any band difference is then a broadcast
+column subtraction, so extra bands (c, V, R, I, ZTF ...) or combos="all"
+cost nothing extra.  Total cost O(n log n + centres × bands × window).
+
+    mean="night"   colour from the mean of the nightly means (watch_mpc_colors)
+    mean="obs"     colour from the mean of all observations in the window (v8.x)
+
+The window sums use the same Kahan-compensated accumulation as pandas'
+groupby mean, so colours are bit-identical to those the per-night loops wrote
+to I3_Color_Alerts.csv (which the watcher de-duplicates on).
+
+color_sweep() evaluates a whole list of tolerances from one matrix — the
+sensitivity study the color_evolution v1…v5_2 scripts did as one full re-run
+per tolerance — by differencing per-band prefix sums built in one pass.
+
+Usage:
+    from color_pairs import color_pairs, color_sweep
+    pairs = color_pairs(night, band, mag_sum, n, centers=np.unique(night),
+                        window_days=1, combos=[("g", "r"), ("g", "o")])
+    every = color_pairs(night, band, mag_sum, n, np.unique(night), 1, combos="all")
+
+    python color_pairs.py I3.txt --sweep 0,0.5,1,2,3     # → I3_Color_Sweep.csv
+    python color_pairs.py I3.txt --sweep 1 --combos all
+
+Author: Salah-Eddin Gherbi
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+PAIR_FIELDS = ["center", "pair", "color", "n_pts", "span_days"]
+
+# Bands from blue to red (approximate effective wavelength): combos="all" emits
+# bluer − redder, the usual sign of a colour index.  A label missing here is
+# looked up with its case swapped, so bands folded to lower case (v, t, j) keep
+# their place; T (broad/unfiltered, ~600 nm) sits with w.
+BAND_ORDER = "uUBgcVwTGrRoiIzyJHK"
+
+def band_rank(band: str) -> int:
+    """Position of a band in BAND_ORDER (case-insensitive fallback), -1 if unknown."""
+    for b in (band, band.swapcase()):
+        if len(b) == 1 and b in BAND_ORDER:
+            return BAND_ORDER.index(b)
+    return -1
+
+def all_combos(bands) -> list:
+    """Every (bluer, redder) pair of the given bands; bands of unknown wavelength are skipped."""
+    bands = sorted(set(bands))
+    unknown = [b for b in bands if band_rank(b) < 0]
+    if unknown:
+        warnings.warn(f"bands {unknown} have no place in BAND_ORDER; left out of combos='all' "
+                      f"(pass them as explicit combos)", stacklevel=2)
+    bands = sorted((b for b in bands if band_rank(b) >= 0), key=lambda b: (band_rank(b), b))
+    return [(a, b) for i, a in enumerate(bands) for b in bands[i + 1:]]
+
+def _two_sum(a, b):
+    """a + b as (rounded sum, exact rounding error), elementwise (Knuth)."""
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+class BandMatrix:
+    """
+    Nightly table pivoted into dense night × band arrays:
+
+        nights      sorted unique night numbers (rows)
+        bands       band labels (columns)
+        mag_sum     summed magnitudes per cell (0 where empty)
+        n           observations per cell (0 = no data that night)
+    """
+
+    def __init__(self, night, band, mag_sum, n, obs_set=None):
+        night = np.asarray(night, dtype=np.int64)
+        band = np.asarray(band, dtype=str)
+        self.nights = np.unique(night)
+        self.bands = np.unique(band)
+        r = np.searchsorted(self.nights, night)
+        c = np.searchsorted(self.bands, band)
+        shape = (len(self.nights), len(self.bands))
+        self.mag_sum = np.zeros(shape)
+        self.n = np.zeros(shape, dtype=np.int64)
+        self.mag_sum[r, c] = np.asarray(mag_sum, dtype=np.float64)
+        self.n[r, c] = np.asarray(n, dtype=np.int64)
+        self.has = self.n > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.nightly_mean = np.where(self.has, self.mag_sum / np.maximum(self.n, 1), 0.0)
+
+        # column-wise prefix sums (row 0 = empty prefix)
+        zero = np.zeros((1, shape[1]), dtype=np.int64)
+        self.nights_cum = np.vstack([zero, np.cumsum(self.has, axis=0)])
+        self.n_cum = np.vstack([zero, np.cumsum(self.n, axis=0)])
+
+        # first data row at/after r and last at/before r, per band (for span_days)
+        rows = np.arange(shape[0])[:, None]
+        self.next_row = np.minimum.accumulate(np.where(self.has, rows, shape[0])[::-1], axis=0)[::-1]
+        self.prev_row = np.maximum.accumulate(np.where(self.has, rows, -1), axis=0)
+
+        # station codes per nightly row (CSR), and the nightly row of every cell
+        self._prefix = {}
+        self.labels = None
+        if obs_set is not None:
+            split = [s.split(",") for s in obs_set]
+            self.labels, flat = np.unique(np.concatenate(split) if split else np.empty(0, str),
+                                          return_inverse=True)
+            self.offs = np.r_[0, np.cumsum([len(s) for s in split])]
+            self.codes = flat
+            self.cell_row = np.full(shape, -1, dtype=np.int64)
+            self.cell_row[r, c] = np.arange(len(night))
+
+    def column(self, band: str) -> int:
+        """Column of a band label, -1 if the band never occurs."""
+        k = np.searchsorted(self.bands, band)
+        return int(k) if k < len(self.bands) and self.bands[k] == band else -1
+
+    def windows(self, centers, window_days):
+        """[lo, hi) row range of nights within ±window_days of every centre."""
+        centers = np.asarray(centers, dtype=np.int64)
+        lo = np.searchsorted(self.nights, centers - window_days, side="left")
+        hi = np.searchsorted(self.nights, centers + window_days, side="right")
+        return lo, hi
+
+    def window_sum(self, values, lo, hi) -> np.ndarray:
+        """
+        centres × bands sums of values[lo:hi] over the cells with data,
+        Kahan-compensated as in pandas' group_mean (same values, same order).
+        """
+        total = np.zeros((len(lo), values.shape[1]))
+        comp = np.zeros_like(total)
+        if values.shape[0] == 0:
+            return total
+        last = values.shape[0] - 1
+        for j in range(int((hi - lo).max(initial=0))):
+            r = np.minimum(lo + j, last)
+            live = (lo + j < hi)[:, None] & self.has[r]
+            y = values[r] - comp
+            t = total + y
+            c = t - total - y
+            comp = np.where(live, np.where(c != c, 0.0, c), comp)
+            total = np.where(live, t, total)
+        return total
+
+    def prefix_sum(self, mean="night"):
+        """
+        Column-wise prefix sums of the nightly means (or sums, mean="obs") as
+        double-double (hi, lo) arrays, row 0 = empty prefix; built once per mean.
+        """
+        if mean not in self._prefix:
+            values = self.mag_sum if mean == "obs" else self.nightly_mean
+            hi = np.zeros((values.shape[0] + 1, values.shape[1]))
+            lo = np.zeros_like(hi)
+            for r in range(values.shape[0]):
+                hi[r + 1], err = _two_sum(hi[r], values[r])
+                lo[r + 1] = lo[r] + err
+            self._prefix[mean] = hi, lo
+        return self._prefix[mean]
+
+    def prefix_window_sum(self, lo, hi, mean="night") -> np.ndarray:
+        """centres × bands window sums as differences of the double-double prefix sums."""
+        P, E = self.prefix_sum(mean)
+        d, err = _two_sum(P[hi], -P[lo])
+        return d + (err + (E[hi] - E[lo]))
+
+    def window_means(self, lo, hi, mean="night", prefix=False):
+        """(mean magnitude, nights with data, observations) per centre × band."""
+        nights = self.nights_cum[hi] - self.nights_cum[lo]
+        n_obs = self.n_cum[hi] - self.n_cum[lo]
+        if prefix:
+            total = self.prefix_window_sum(lo, hi, mean)
+        else:
+            total = self.window_sum(self.mag_sum if mean == "obs" else self.nightly_mean, lo, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = total / (n_obs if mean == "obs" else nights)
+        return m, nights, n_obs
+
+    def stations(self, lo, hi, cols) -> str:
+        """Sorted union of the station codes behind the cells rows lo:hi × cols."""
+        rows = self.cell_row[lo:hi, cols].ravel()
+        rows = rows[rows >= 0]
+        parts = [self.codes[self.offs[k]:self.offs[k + 1]] for k in rows]
+        return ",".join(self.labels[np.unique(np.concatenate(parts))]) if parts else ""
+
+    def pairs(self, centers, window_days, combos="all", mean="night", prefix=False) -> pd.DataFrame:
+        """
+        PAIR_FIELDS (+ obs_set) for every centre × combo with data in both bands;
+        prefix=True takes the window sums from the shared prefix sums.
+        """
+        centers = np.asarray(centers, dtype=np.int64)
+        if isinstance(combos, str) and combos == "all":
+            combos = all_combos(self.bands)
+        combos = [(f1, f2) for f1, f2 in combos if self.column(f1) >= 0 and self.column(f2) >= 0]
+        i = np.array([self.column(f1) for f1, _ in combos], dtype=np.int64)
+        j = np.array([self.column(f2) for _, f2 in combos], dtype=np.int64)
+
+        lo, hi = self.windows(centers, window_days)
+        m, nights, n_obs = self.window_means(lo, hi, mean, prefix)
+        color = m[:, i] - m[:, j]                                    # centres × combos
+        ok = (nights[:, i] > 0) & (nights[:, j] > 0)
+
+        # centre-major output order: (centre 0: combos...), (centre 1: combos...), ...
+        ci, ki = np.nonzero(ok)
+        bi, bj = i[ki], j[ki]
+        r0 = np.minimum(lo[ci], len(self.nights) - 1)                # first / last window row
+        r1 = np.maximum(hi[ci] - 1, 0)
+        first = np.minimum(self.next_row[r0, bi], self.next_row[r0, bj])
+        last = np.maximum(self.prev_row[r1, bi], self.prev_row[r1, bj])
+        names = np.array([f"{f1}-{f2}" for f1, f2 in combos], dtype=object)
+        out = pd.DataFrame({
+            "center": centers[ci],
+            "pair": names[ki] if len(ci) else np.empty(0, object),
+            "color": color[ci, ki],
+            "n_pts": n_obs[ci, bi] + n_obs[ci, bj],
+            "span_days": (self.nights[last] - self.nights[first]) if len(ci) else np.empty(0, np.int64),
+        })
+        if self.labels is not None:
+            out["obs_set"] = [self.stations(lo[c], hi[c], [a, b]) for c, a, b in zip(ci, bi, bj)]
+        return out
+
+def color_pairs(night, band, mag_sum, n, centers, window_days, combos="all", obs_set=None,
+                mean="night") -> pd.DataFrame:
+    """
+    Colour pairs from a nightly table with one row per (night, band):
+
+        night     int day numbers (e.g. ObsStore.night)
+        band      band labels
+        mag_sum   sum of the night's magnitudes in that band
+        n         number of observations behind mag_sum
+        obs_set   optional comma-joined station codes per row
+
+    Returns PAIR_FIELDS (+ obs_set) for every centre × combo whose two bands
+    both have data within ±window_days, in centres order then combos order.
+    combos="all" emits every bluer − redder pair of the bands present.
+    """
+    return BandMatrix(night, band, mag_sum, n, obs_set).pairs(centers, window_days, combos, mean)
+
+def color_sweep(night, band, mag_sum, n, centers, tolerances, combos="all", obs_set=None,
+                mean="night") -> pd.DataFrame:
+    """
+    color_pairs() for a whole list of tolerances (days, may be fractional) from
+    one matrix: a tidy table with a leading 'tolerance' column.  The per-band
+    prefix sums are built once (double-double) and every tolerance's window
+    sums are two lookups and a difference, with no rescan per tolerance.
+    Rows, counts and spans equal a color_pairs() run with that window; colours
+    agree to a few ulp (< 1e-14 mag) rather than bit for bit, since the Kahan
+    window scan rounds differently.
+    """
+    matrix = BandMatrix(night, band, mag_sum, n, obs_set)
+    parts = [matrix.pairs(centers, tol, combos, mean, prefix=True) for tol in tolerances]
+    for tol, part in zip(tolerances, parts):
+        part.insert(0, "tolerance", float(tol))
+    if not parts:
+        return pd.DataFrame(columns=["tolerance"] + PAIR_FIELDS)
+    return pd.concat(parts, ignore_index=True)
+
+if __name__ == "__main__":
+    import argparse
+
+    from obs_store import ObsStore
+
+    p = argparse.ArgumentParser(description="Colour indices of 3I/ATLAS for a sweep of pairing tolerances.")
+    p.add_argument("file", nargs="?", default="I3.txt", help="MPC file (default: I3.txt)")
+    p.add_argument("--sweep", default="0,0.5,1,2,3", help="comma-separated tolerances in days")
+    p.add_argument("--mean", choices=("night", "obs"), default="night",
+                   help="average nightly means (default) or all observations in the window")
+    p.add_argument("--combos", default="g-r,g-o,r-o", help="comma-separated pairs, or 'all'")
+    p.add_argument("--out", default="I3_Color_Sweep.csv")
+    args = p.parse_args()
+
+    combos = "all" if args.combos == "all" else [tuple(c.split("-")) for c in args.combos.split(",")]
+    tolerances = [float(t) for t in args.sweep.split(",")]
+
+    # CCD magnitudes given to 0.01 mag, bands folded to lower case (the legacy selection)
+    store = ObsStore.from_mpc_file(args.file, notes="C")
+    store = store.select(~np.isnan(store.mag) & (store.mag_dec == 2)).map_bands(str.lower)
+    nightly = store.index("band", "night")
+    nights = nightly.keys["night"]
+    sweep = color_sweep(nights, store.bands[nightly.keys["band"]], nightly.sum(store.mag64),
+                        nightly.counts, np.unique(nights), tolerances, combos, mean=args.mean)
+    sweep.insert(1, "date", pd.to_datetime(sweep.pop("center"), unit="D").dt.strftime("%Y-%m-%d"))
+    sweep.to_csv(args.out, index=False)
+
+    print(f"🎛️ {len(store)} observations, {len(np.unique(nights))} nights, tolerances {tolerances}")
+    summary = sweep.groupby(["tolerance", "pair"])["color"].agg(["count", "median", "std"])
+    print(summary.round(3).to_string())
+    print(f"📊 Saved: {args.out} ({len(sweep)} rows)")
@@ -4,11 +4,14 @@ color_validation_I3_ATLAS_v2_2.py
 ---------------------------------
 Color-evolution validation for 3I/ATLAS (C/2019 Y4), Sep–Oct 2025.
 
-• Parses MPC file I3.txt (photometry lines starting with '0003I' and 'C2025').
+• Parses MPC file I3.txt (photometry lines starting with '0003I' and 'C2025')
+  with the shared fixed-width parser, packed into the typed store (obs_store.py).
 • Builds nightly per-filter magnitudes PER MPC STATION (obs code), then
   forms color pairs (g–r, g–o, r–o) using same-night data with ±1 day tolerance
   but still within the SAME station to minimize calibration drift.
-• Fetches phase angle (alpha) for those nights from JPL Horizons (@399 geocenter).
+• Phase angle (alpha) for those nights from JPL Horizons (@399 geocenter),
+  through the offline ephemeris cache (ephem_cache.py; queried once), else
+  from the offline two-body orbit (two_body.py).
 • Regressions:
     - Color vs time (OLS; Theil–Sen if scikit-learn available)
     - Color vs phase angle (OLS; Theil–Sen if available)
@@ -20,7 +23,6 @@ Dependencies: pandas, numpy, matplotlib, astroquery (for Horizons)
 Optional: scikit-learn (for robust Theil–Sen)
 """
 
-import re
 import sys
 from datetime import datetime, timedelta
 
@@ -28,6 +30,11 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from ephem_cache import ephemeris
+from two_body import geometry
+from mpc_parser import NS_PER_DAY
+from obs_store import ObsStore
+
 # ---- Optional robust fit (Theil–Sen) ----
 HAVE_SKLEARN = False
 try:
@@ -36,13 +43,6 @@ try:
 except Exception:
     HAVE_SKLEARN = False
 
-# ---- Horizons for phase angle ----
-try:
-    from astroquery.jplhorizons import Horizons
-    HAVE_HORIZONS = True
-except Exception:
-    HAVE_HORIZONS = False
-
 # -----------------------------
 # Configuration
 # -----------------------------
@@ -58,149 +58,103 @@ DATE_TOLERANCE = pd.Timedelta(days=1)
 # -----------------------------
 # Helpers
 # -----------------------------
-def frac_day_to_ts(month: int, day_float: float) -> pd.Timestamp:
-    """MPC dates are like '09 04.273606'. Convert to UTC timestamp."""
-    d_int = int(day_float)
-    frac = day_float - d_int
-    base = pd.Timestamp(f"2025-{month:02d}-{d_int:02d} 00:00:00", tz="UTC")
-    return base + pd.to_timedelta(frac * 24, unit="h")
-
-def parse_mpc_photometry(mpc_path: str) -> pd.DataFrame:
+def parse_mpc_photometry(mpc_path: str) -> ObsStore:
     """
     Parse lines like:
     0003I ... C2025 09 04.273606 ... 16.29gV#0K4fE55
                                    ^^^^^^^^
-    Extract month, day.frac, magnitude, filter (g/r/o/c/v), and obs code (last 3).
+    Extract date, magnitude, filter (g/r/o/c/v) and obs code (cols 78–80)
+    into the typed observation store (obs_store.py).
     """
-    rows = []
-    with open(mpc_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            if not line.startswith("0003I"):
-                continue
-            if "C2025" not in line:
-                continue
-
-            # date fragment
-            m = re.search(r"C2025\s+(\d{2})\s+(\d{2}\.\d+)", line)
-            if not m:
-                continue
-            month = int(m.group(1))
-            dayf  = float(m.group(2))
-
-            # magnitude + filter (e.g., '16.29g' or '14.85o')
-            mm = re.search(r"(\d{2}\.\d{2})([grcVoB])", line)
-            if not mm:
-                continue
-            mag = float(mm.group(1))
-            flt = mm.group(2).lower()
-
-            # observatory code: last 3 alphanumerics on the line
-            oc = "UNK"
-            mcode = re.search(r"([A-Za-z0-9]{3})\s*$", line.strip())
-            if mcode:
-                oc = mcode.group(1)
-
-            ts = frac_day_to_ts(month, dayf)
-
-            rows.append({
-                "date_utc": ts, "month": month, "dayf": dayf,
-                "mag": mag, "filter": flt, "obs_code": oc
-            })
-
-    df = pd.DataFrame(rows)
+    store = ObsStore.from_mpc_file(mpc_path, obj="0003I", notes="C")
+    store = store.select(~np.isnan(store.mag) & (store.mag_dec == 2) & store.band_isin("grcVoB"))
     # Limit to desired filters
-    df = df[df["filter"].isin(FILTERS)].copy()
-    return df
-
-def nightly_station_means(df: pd.DataFrame) -> pd.DataFrame:
-    """Bin to local 'night' (UTC day) per station & filter."""
-    df = df.copy()
-    df["night"] = df["date_utc"].dt.floor("D")
-    g = df.groupby(["obs_code", "night", "filter"], as_index=False)["mag"].agg(["mean", "count", "std"])
-    g = g.reset_index().rename(columns={"mean": "mag_mean", "count": "n", "std": "mag_std"})
-    return g
+    store = store.map_bands(str.lower)
+    return store.select(store.band_isin(FILTERS))
+
+def nightly_station_means(store: ObsStore) -> pd.DataFrame:
+    """Bin to local 'night' (UTC day) per station & filter — one slice per group of the store index."""
+    groups = store.index("station", "night", "band")
+    mag = store.mag64
+    g = pd.DataFrame({
+        "obs_code": store.stations[groups.keys["station"]],
+        "night": pd.to_datetime(groups.keys["night"] * NS_PER_DAY, utc=True),
+        "filter": store.bands[groups.keys["band"]],
+        "mag_mean": groups.mean(mag),
+        "n": groups.counts,
+        "mag_std": groups.std(mag),
+    })
+    g["obs_code"] = g["obs_code"].replace("", "UNK")
+    return g.sort_values(["obs_code", "night", "filter"]).reset_index(drop=True)
 
 def build_color_pairs(nightly: pd.DataFrame) -> pd.DataFrame:
     """
     Form color pairs within the SAME obs_code.
     Same-night pairs first; if missing, allow ±1 day match.
+
+    `nightly` must have one row per (obs_code, night, filter), as
+    nightly_station_means() gives; merged stations are averaged first.
+
+    Vectorized across all stations and pairs: same-night pairs are an inner
+    join of the per-(station, night, filter) means, and the ±1 day fallback is
+    a nearest-night merge_asof by station (ties → the earlier night).
     """
+    cols = ["obs_code", "night", "pair", "color", "pair_mode"]
+    key = ["obs_code", "night"]
+    means = nightly[key + ["filter", "mag_mean"]]
     out = []
 
-    # Work station by station
-    for oc, sub in nightly.groupby("obs_code"):
-        sub = sub.copy().sort_values("night")
-        # Pivot to have columns per filter for easy same-night pairing
-        piv = sub.pivot_table(index="night", columns="filter", values="mag_mean", aggfunc="mean")
-
-        # Same-night pairs
-        for (f1, f2) in PAIR_LIST:
-            lbl = f"{f1}-{f2}"
-            if (f1 in piv.columns) and (f2 in piv.columns):
-                same = piv[[f1, f2]].dropna()
-                for dt, row in same.iterrows():
-                    out.append({"obs_code": oc, "night": dt, "pair": lbl,
-                                "color": float(row[f1] - row[f2]),
-                                "pair_mode": "same-night"})
-
-        # ±1 day tolerance (only if not same-night)
-        # Build a long format for nearest-night search
-        for (f1, f2) in PAIR_LIST:
-            lbl = f"{f1}-{f2}"
-            # dates where pair already exists (avoid duplicates)
-            have_dates = {r["night"] for r in out if r["obs_code"] == oc and r["pair"] == lbl and r["pair_mode"] == "same-night"}
-
-            # candidate nights with f1
-            n1 = sub[sub["filter"] == f1][["night", "mag_mean"]].rename(columns={"mag_mean": "m1"})
-            # candidate nights with f2
-            n2 = sub[sub["filter"] == f2][["night", "mag_mean"]].rename(columns={"mag_mean": "m2"})
-
-            for dt1, m1 in n1.itertuples(index=False):
-                if dt1 in have_dates:
-                    continue  # already have same-night
-                # search for f2 within ±1 day
-                close = n2[(n2["night"] >= dt1 - DATE_TOLERANCE) & (n2["night"] <= dt1 + DATE_TOLERANCE)]
-                if not close.empty:
-                    # pick the nearest night in absolute difference
-                    close["absdiff"] = (close["night"] - dt1).abs()
-                    row2 = close.sort_values("absdiff").iloc[0]
-                    out.append({
-                        "obs_code": oc, "night": dt1, "pair": lbl,
-                        "color": float(m1 - row2["m2"]),
-                        "pair_mode": "±1day"
-                    })
-
+    for (f1, f2) in PAIR_LIST:
+        lbl = f"{f1}-{f2}"
+        m1 = means[means["filter"] == f1]
+        m2 = means[means["filter"] == f2]
+        same = m1.merge(m2, on=key, suffixes=("_1", "_2"))
+        out.append(pd.DataFrame({
+            "obs_code": same["obs_code"], "night": same["night"], "pair": lbl,
+            "color": same["mag_mean_1"] - same["mag_mean_2"], "pair_mode": "same-night",
+        }))
+
+        # ±1 day tolerance (only if not same-night): every f1 row without a same-night
+        # partner takes the nearest f2 night of its station
+        n1 = m1.merge(same[key], on=key, how="left", indicator=True)
+        n1 = n1[n1["_merge"] == "left_only"].drop(columns=["_merge", "filter"])
+        n2 = m2.drop(columns="filter")
+        if n1.empty or n2.empty:
+            continue
+        near = pd.merge_asof(
+            n1.sort_values("night", kind="stable"), n2.sort_values("night", kind="stable"),
+            on="night", by="obs_code", direction="nearest", tolerance=DATE_TOLERANCE,
+            suffixes=("_1", "_2"),
+        ).dropna(subset=["mag_mean_2"])
+        out.append(pd.DataFrame({
+            "obs_code": near["obs_code"], "night": near["night"], "pair": lbl,
+            "color": near["mag_mean_1"] - near["mag_mean_2"], "pair_mode": "±1day",
+        }))
+
+    out = [o for o in out if not o.empty]
     if not out:
-        return pd.DataFrame(columns=["obs_code", "night", "pair", "color", "pair_mode"])
+        return pd.DataFrame(columns=cols)
 
-    pairs_df = pd.DataFrame(out).sort_values(["obs_code", "night", "pair"]).reset_index(drop=True)
+    pairs_df = pd.concat(out, ignore_index=True)[cols]
+    pairs_df = pairs_df.sort_values(["obs_code", "night", "pair"], kind="stable").reset_index(drop=True)
     return pairs_df
 
 def fetch_phase_angles(dates_utc: list) -> pd.DataFrame:
-    """Fetch phase angle alpha (deg) from Horizons @399 (geocenter) for given dates."""
-    if not HAVE_HORIZONS:
-        print("⚠️  astroquery.jplhorizons not available — skipping phase angles.")
-        return pd.DataFrame({"night": dates_utc, "phase_deg": [np.nan]*len(dates_utc)})
-
+    """Phase angle alpha (deg) from Horizons @399 (geocenter) at the given dates (cached, interpolated)."""
     # Horizons expects strings in UTC; give a small range to ensure coverage
     t_start = (min(dates_utc) - pd.Timedelta(hours=1)).strftime("%Y-%m-%d")
     t_stop  = (max(dates_utc) + pd.Timedelta(hours=1)).strftime("%Y-%m-%d")
 
     try:
         # Use the un-split parent solution ID (matches earlier usage)
-        obj = Horizons(id="90004574", location="@399",
-                       epochs={"start": t_start, "stop": t_stop, "step": "1d"})
-        eph = obj.ephemerides()
+        eph = ephemeris("90004574", "@399", t_start, t_stop, step="1d")
         # alpha column is the phase angle (Sun-Target-Observer)
-        tbl = pd.DataFrame({
-            "night": pd.to_datetime(eph["datetime_str"]),
-            "phase_deg": np.array(eph["alpha"], dtype=float)
-        })
-        tbl["night"] = tbl["night"].dt.tz_localize("UTC").dt.floor("D")
-        return tbl[["night", "phase_deg"]].drop_duplicates("night")
+        nights = pd.Series(dates_utc).drop_duplicates().reset_index(drop=True)
+        return pd.DataFrame({"night": nights, "phase_deg": eph("alpha", nights)})
     except Exception as e:
-        print(f"⚠️  Horizons phase-angle fetch failed: {e}")
-        return pd.DataFrame({"night": dates_utc, "phase_deg": [np.nan]*len(dates_utc)})
+        print(f"⚠️  Horizons phase-angle fetch failed: {e} — using the offline two-body orbit.")
+        nights = pd.Series(dates_utc).drop_duplicates().reset_index(drop=True)
+        return pd.DataFrame({"night": nights, "phase_deg": geometry(nights)["alpha"].to_numpy()})
 
 def fit_and_report(x, y, label):
     """Run OLS (always) and Theil–Sen (if available). Return dict of results."""
@@ -244,17 +198,17 @@ def fit_and_report(x, y, label):
 # -----------------------------
 if __name__ == "__main__":
     print("📂 Parsing MPC photometry…")
-    df = parse_mpc_photometry(MPC_FILE)
-    if df.empty:
+    store = parse_mpc_photometry(MPC_FILE)
+    if len(store) == 0:
         print("❌ No usable MPC photometry found.")
         sys.exit(1)
 
     # Restrict time range
-    df = df[(df["date_utc"] >= START) & (df["date_utc"] <= END)].copy()
-    print(f"✅ Kept {len(df)} measurements between {START.date()} and {END.date()}")
+    store = store.select((store.t >= START.value) & (store.t <= END.value))
+    print(f"✅ Kept {len(store)} measurements between {START.date()} and {END.date()}")
 
     # Nightly per-station means
-    nightly = nightly_station_means(df)
+    nightly = nightly_station_means(store)
     if nightly.empty:
         print("❌ No nightly station-averaged data.")
         sys.exit(1)
@@ -263,6 +217,7 @@ if __name__ == "__main__":
     MERGE_STATIONS = True
     if MERGE_STATIONS:
         nightly["obs_code"] = "ALL"
+        nightly = nightly.groupby(["obs_code", "night", "filter"], as_index=False)["mag_mean"].mean()
 
     # Build color pairs
     pairs = build_color_pairs(nightly)
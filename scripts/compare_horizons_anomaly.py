@@ -1,8 +1,9 @@
 import pandas as pd
-from astroquery.jplhorizons import Horizons
 import numpy as np
 import matplotlib.pyplot as plt
 
+from ephem_cache import ephemeris
+
 # ------------------------------------------------------------
 # Step 1: Load your MPC photometry
 # ------------------------------------------------------------
@@ -11,36 +12,31 @@ df["date"] = pd.to_datetime(df["date"])
 df = df.sort_values("date")
 
 start_date = df["date"].min().strftime("%Y-%m-%d")
-end_date   = df["date"].max().strftime("%Y-%m-%d")
+end_date   = (df["date"].max() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")   # +1 d: brackets the last obs for interpolation only
 
 print(f"Querying JPL Horizons for range: {start_date} to {end_date}")
 
 # ------------------------------------------------------------
-# Step 2: Query daily ephemerides (no long URI!)
+# Step 2: Daily ephemerides (offline cache; Horizons is queried once)
 # ------------------------------------------------------------
-obj = Horizons(
-    id="90004574",             # Primary nucleus of C/2019 Y4 (ATLAS)
-    location="@399",           # Earth-based apparent magnitude
-    epochs={"start": start_date,
-            "stop":  end_date,
-            "step": "1d"}
+ephem = ephemeris(
+    "90004574",                # Primary nucleus of C/2019 Y4 (ATLAS)
+    "@399",                    # Earth-based apparent magnitude
+    start_date, end_date, step="1d",
 )
-
-
-
-eph = obj.ephemerides()
+eph = ephem.table
 
 # Automatically detect magnitude column
 mag_key = None
 for key in ["V", "Vmag", "Tmag", "Nmag", "APmag"]:
-    if key in eph.colnames:
+    if key in eph.columns:
         mag_key = key
         break
 if not mag_key:
     raise KeyError("No magnitude column found in JPL Horizons response.")
 
 geo = pd.DataFrame({
-    "date": pd.to_datetime(eph["datetime_str"]),
+    "date": pd.to_datetime(eph["datetime_jd"], unit="D", origin="julian"),
     "r": eph["r"],
     "delta": eph["delta"],
     "phase": eph["alpha"],
@@ -49,9 +45,14 @@ geo = pd.DataFrame({
 print(f"✅ Using magnitude column: {mag_key}")
 
 # ------------------------------------------------------------
-# Step 3: Merge with MPC data (nearest date)
+# Step 3: Ephemeris at every MPC observation time (interpolated, not nearest day)
 # ------------------------------------------------------------
-merged = pd.merge_asof(df.sort_values("date"), geo.sort_values("date"), on="date")
+merged = df.sort_values("date").reset_index(drop=True)
+at = ephem.at(merged["date"], ["r", "delta", "alpha", mag_key])
+merged["r"] = at["r"]
+merged["delta"] = at["delta"]
+merged["phase"] = at["alpha"]
+merged["pred_mag"] = at[mag_key]
 
 # ------------------------------------------------------------
 # Step 4: Compute residuals (observed - predicted)
@@ -87,7 +88,8 @@ obs = pd.read_csv("I3_monthly_summary.csv")
 obs["month"] = pd.to_datetime(obs["month"])
 obs_means = obs[["month", "mean"]].rename(columns={"mean": "obs_mag"})
 
-# Predicted monthly mean magnitudes from JPL Horizons
+# Predicted monthly mean magnitudes from JPL Horizons (observed span only, not the padding day)
+geo = geo[geo["date"] <= df["date"].max()].copy()
 geo["month"] = geo["date"].dt.to_period("M").dt.to_timestamp()
 pred_means = geo.groupby("month")["pred_mag"].mean().reset_index()
 pred_means = pred_means.rename(columns={"pred_mag": "pred_mag"})
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+ephem_cache.py
+Offline JPL Horizons ephemerides: a local table cache plus Chebyshev
+interpolators.
+
+A Horizons query is stored once per (target, observer location, step, span)
+next to the parse cache, as a column bundle (the same .npy-per-column layout
+mpc_cache uses) with a small index:
+
+    <cache>/ephem/
+        index.json                 target, location, step, start_jd, stop_jd → entry
+        <key>/meta.json, *.npy     the ephemeris table (datetime_jd, r, delta, alpha, RA, ...)
+
+Any later request whose span lies inside a cached one for the same target,
+location and step is answered from disk without a query, trimmed to the
+requested rows.  Misses go through prefetch(), which coalesces: per
+target / location / step, overlapping or adjacent requested spans and the
+cached entries they touch are merged into one span, only its uncovered parts
+are fetched, split into calls of at most CHUNK_ROWS epochs, and the calls run
+concurrently (asyncio, at most MAX_CONCURRENCY in flight; from a thread of
+its own when an event loop is already running, e.g. in Jupyter).  The merged table replaces the entries it
+absorbed, so a season for several observatories is one prefetch() and a
+handful of parallel calls.
+
+Each quantity is fitted with Chebyshev polynomials on consecutive segments
+of SEG_ROWS table rows (neighbouring segments share their end node).
+Evaluation finds every timestamp's segment with one searchsorted and runs
+Clenshaw's recurrence over all timestamps at once, so r, delta, alpha,
+RA/Dec or elevation at millions of observation times costs milliseconds and
+no network.  RA is unwrapped before fitting and returned in [0, 360);
+timestamps outside the table span give NaN.
+
+The Horizons call itself goes through `query` (default: horizons_query,
+astroquery); pass any callable (target, location, start, stop, step) →
+DataFrame with the same column names to run from a local stand-in.
+
+Usage:
+    from ephem_cache import ephemeris
+    eph = ephemeris("90004574", "@399", "2025-07-01", "2025-12-31", step="1h")
+    geo = eph.at(obs["date_utc"], ["r", "delta", "alpha"])    # one row per timestamp
+    tbl = eph.table                                           # the cached Horizons rows
+    prefetch([("90004574", loc, "2025-07-01", "2025-12-31", "30m") for loc in ("I41", "T08", "@399")])
+
+    python ephem_cache.py 90004574 I41,T08,@399 2025-07-01 2025-12-31 --step 30m
+    python ephem_cache.py --list
+
+Author: Salah-Eddin Gherbi
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mpc_cache import CACHE_DIR, _read_json, _write_json, load_bundle, save_bundle
+
+EPHEM_DIR = Path(os.environ.get("EPHEM_CACHE_DIR", CACHE_DIR.parent / "ephem"))
+INDEX = "index.json"
+SEG_ROWS = 12                     # table rows per Chebyshev segment
+CHEB_DEG = 7                      # polynomial degree per segment (< SEG_ROWS: least squares)
+QUANTITIES = ("r", "delta", "alpha", "RA", "DEC", "EL")
+EVAL_CHUNK = 16384               # timestamps per Clenshaw block; keeps temporaries cache-resident
+WRAPPED = {"RA": 360.0}           # angles fitted unwrapped, returned modulo the period
+CHUNK_ROWS = 10_000               # epochs per Horizons call (the service caps long tables)
+MAX_CONCURRENCY = 4               # Horizons calls in flight at once
+JD_UNIX_EPOCH = 2440587.5
+JD_EPS = 1e-6                     # ~0.1 s: epochs closer than this are the same epoch
+NS_PER_DAY = 86_400 * 10**9
+
+# ------------------------------------------------------------
+# Horizons
+# ------------------------------------------------------------
+def horizons_query(target, location, start, stop, step) -> pd.DataFrame:
+    """Live Horizons ephemeris table as a DataFrame (astroquery column names)."""
+    try:
+        from astroquery.jplhorizons import Horizons
+    except ImportError:
+        raise ImportError("astroquery not installed; only cached ephemerides are available.")
+    obj = Horizons(id=target, location=location, epochs={"start": start, "stop": stop, "step": step})
+    return obj.ephemerides().to_pandas()
+
+def to_jd(t) -> np.ndarray:
+    """Julian dates of timestamps (datetime-likes, UTC if naive) or of numbers already in JD."""
+    t = pd.Series(t) if not isinstance(t, (pd.Series, pd.Index)) else t
+    if pd.api.types.is_numeric_dtype(t.dtype):
+        return np.asarray(t, dtype=np.float64)
+    ns = np.asarray(pd.to_datetime(t, utc=True).astype("datetime64[ns, UTC]").astype(np.int64))
+    return ns / NS_PER_DAY + JD_UNIX_EPOCH
+
+# ------------------------------------------------------------
+# Chebyshev segments
+# ------------------------------------------------------------
+class ChebSegments:
+    """Piecewise Chebyshev fit y(x) over sorted nodes x; callable on any array of x."""
+
+    def __init__(self, x, y, seg_rows=SEG_ROWS, deg=CHEB_DEG):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        starts = np.arange(0, max(len(x) - 1, 1), seg_rows - 1)
+        stops = np.minimum(starts + seg_rows, len(x))
+        self.bounds = np.r_[x[starts], x[-1]] if len(x) else np.empty(0)
+        # A short last segment is fitted over the last seg_rows rows (reaching into
+        # its neighbour) so it keeps the full degree; it still only serves its own bounds
+        fit_starts = np.minimum(starts, np.maximum(stops - seg_rows, 0))
+        coef = np.full((len(starts), deg + 1), np.nan)
+        self.mid = np.zeros(len(starts))
+        self.scale = np.zeros(len(starts))
+        for i, (a, b) in enumerate(zip(fit_starts, stops)):
+            xs, ys = x[a:b], y[a:b]
+            if len(xs) < 2 or not np.isfinite(ys).all():
+                continue                                   # masked rows: NaN segment
+            self.mid[i], self.scale[i] = (xs[0] + xs[-1]) / 2, 2 / (xs[-1] - xs[0])
+            u = (xs - self.mid[i]) * self.scale[i]
+            coef[i] = 0
+            coef[i, :min(deg, len(xs) - 1) + 1] = np.polynomial.chebyshev.chebfit(u, ys, min(deg, len(xs) - 1))
+        self.coef = np.ascontiguousarray(coef.T)           # (deg + 1, segments): 1-D gathers
+        width = np.diff(self.bounds)
+        # A fixed Horizons step gives equal-width segments (the last one may be shorter)
+        self.uniform = len(width) > 1 and np.allclose(width[:-1], width[0], rtol=1e-6, atol=0)
+        self.width0 = width[0] if len(width) else 1.0
+
+    def locate(self, x):
+        """(segment, 2u, inside) of every x; shared by all fits over the same nodes."""
+        x = np.asarray(x, dtype=np.float64)
+        inside = (x >= self.bounds[0]) & (x <= self.bounds[-1]) if len(self.bounds) > 1 \
+            else np.zeros(x.shape, dtype=bool)
+        if not inside.all():
+            x = x[inside]
+        if self.uniform:
+            seg = ((x - self.bounds[0]) * (1 / self.width0)).astype(np.intp)
+            np.minimum(seg, len(self.mid) - 1, out=seg)
+        else:
+            seg = np.searchsorted(self.bounds, x, side="right") - 1
+            np.clip(seg, 0, len(self.mid) - 1, out=seg)
+        return seg, 2 * (x - self.mid.take(seg)) * self.scale.take(seg), inside
+
+    def evaluate(self, loc) -> np.ndarray:
+        seg, u2, inside = loc
+        y = np.empty(len(seg))
+        b1, b2, tmp = (np.empty(min(EVAL_CHUNK, len(seg))) for _ in range(3))
+        # Clenshaw, vectorized over cache-sized chunks of timestamps, in place
+        for lo in range(0, len(seg), EVAL_CHUNK):
+            s, u = seg[lo:lo + EVAL_CHUNK], u2[lo:lo + EVAL_CHUNK]
+            c1, c2, t = b1[:len(s)], b2[:len(s)], tmp[:len(s)]
+            c1[:] = 0
+            c2[:] = 0
+            for k in range(len(self.coef) - 1, 0, -1):
+                np.multiply(u, c1, out=t)
+                t -= c2
+                t += self.coef[k].take(s)
+                c1, c2, t = t, c1, c2
+            np.multiply(u, c1, out=t)
+            t *= 0.5
+            t -= c2
+            t += self.coef[0].take(s)
+            y[lo:lo + len(s)] = t
+        if inside.all():
+            return y
+        out = np.full(inside.shape, np.nan)
+        out[inside] = y
+        return out
+
+    def __call__(self, x) -> np.ndarray:
+        return self.evaluate(self.locate(x))
+
+class Ephemeris:
+    """A cached Horizons table and lazily built per-quantity interpolators."""
+
+    def __init__(self, table: pd.DataFrame, meta=None):
+        self.table = table
+        self.meta = meta or {}
+        self.jd = np.asarray(table["datetime_jd"], dtype=np.float64)
+        self._fits = {}
+
+    def interpolator(self, name) -> ChebSegments:
+        if name not in self._fits:
+            y = np.asarray(self.table[name], dtype=np.float64)
+            if name in WRAPPED:
+                y = np.unwrap(y, period=WRAPPED[name])
+            self._fits[name] = ChebSegments(self.jd, y)
+        return self._fits[name]
+
+    def _evaluate(self, name, loc) -> np.ndarray:
+        y = self.interpolator(name).evaluate(loc)
+        return np.mod(y, WRAPPED[name]) if name in WRAPPED else y
+
+    def __call__(self, name, t) -> np.ndarray:
+        """`name` at timestamps t (datetime-likes or JD)."""
+        return self._evaluate(name, self.interpolator(name).locate(to_jd(t)))
+
+    def at(self, t, quantities=QUANTITIES) -> pd.DataFrame:
+        """DataFrame of the interpolated quantities, one row per timestamp."""
+        jd = to_jd(t)
+        if not quantities:
+            return pd.DataFrame({"jd": jd})
+        loc = self.interpolator(quantities[0]).locate(jd)     # same nodes for every quantity
+        return pd.DataFrame({"jd": jd, **{q: self._evaluate(q, loc) for q in quantities}})
+
+# ------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------
+def _key(target, location, step, start, stop) -> str:
+    spec = json.dumps([str(target), str(location), str(step), str(start), str(stop)])
+    return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+def _span_jd(start, stop):
+    return tuple(float(v) for v in to_jd([pd.Timestamp(start), pd.Timestamp(stop)]))
+
+def _jd_str(jd) -> str:
+    """Horizons epoch string (UTC, to the minute) of a Julian date."""
+    ns = round((jd - JD_UNIX_EPOCH) * NS_PER_DAY)
+    return pd.Timestamp(ns, unit="ns").round("min").strftime("%Y-%m-%d %H:%M")
+
+def step_days(step) -> float:
+    """Horizons step ('30m', '3h', '1d', ...) in days."""
+    m = re.fullmatch(r"\s*(\d+)\s*([mhd])\s*", str(step))
+    if not m:
+        raise ValueError(f"unsupported Horizons step {step!r} (use N m / N h / N d)")
+    return int(m.group(1)) * {"m": 1 / 1440, "h": 1 / 24, "d": 1.0}[m.group(2)]
+
+def _for_bundle(df: pd.DataFrame) -> pd.DataFrame:
+    """Text columns (solar_presence, datetime_str, ...) as categoricals so they memory-map."""
+    df = df.reset_index(drop=True)
+    for name in df.columns:
+        if df[name].dtype == object or pd.api.types.is_string_dtype(df[name].dtype) \
+                or isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(str).astype("category")
+    return df
+
+def cached_entries(cache_dir=None) -> pd.DataFrame:
+    index = _read_json(Path(cache_dir or EPHEM_DIR) / INDEX) or []
+    return pd.DataFrame(index, columns=["key", "target", "location", "step", "start", "stop",
+                                        "start_jd", "stop_jd", "rows"])
+
+def _covering(index, group, start_jd, stop_jd):
+    for e in index:
+        if (e["target"], e["location"], e["step"]) == group \
+                and e["start_jd"] <= start_jd + JD_EPS and e["stop_jd"] >= stop_jd - JD_EPS:
+            return e
+    return None
+
+def _save_entry(root: Path, entry: dict, table: pd.DataFrame, absorbed=()):
+    """Write one entry and drop the entries it supersedes (write-then-rename)."""
+    key = entry["key"]
+    tmp = root / f".{key}.{os.getpid()}.tmp"
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        save_bundle(table, tmp, meta=entry)
+        shutil.rmtree(root / key, ignore_errors=True)
+        os.replace(tmp, root / key)
+        drop = {key, *absorbed}
+        index = [e for e in (_read_json(root / INDEX) or []) if e["key"] not in drop] + [entry]
+        _write_json(root / INDEX, index)
+        for old in absorbed:
+            if old != key:
+                shutil.rmtree(root / old, ignore_errors=True)
+    except OSError:
+        pass                                       # read-only cache: still usable this run
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+# ------------------------------------------------------------
+# Coalesced, chunked, concurrent Horizons fetches
+# ------------------------------------------------------------
+def _merge(spans, gap):
+    """Union of [start, stop] intervals, joining intervals at most `gap` apart."""
+    out = []
+    for a, b in sorted(spans):
+        if out and a <= out[-1][1] + gap + JD_EPS:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return out
+
+def _chunks(a, b, dt, rows=CHUNK_ROWS):
+    """[a, b] as consecutive spans of at most `rows` epochs on the a + k·dt grid."""
+    n = int(np.floor((b - a) / dt + JD_EPS)) + 1
+    return [(a + i * dt, a + (min(i + rows, n) - 1) * dt) for i in range(0, n, rows)]
+
+async def _fetch_chunks(jobs, query, workers):
+    """Run query(*job) for every job in threads, at most `workers` at a time."""
+    gate = asyncio.Semaphore(workers)
+
+    async def one(job):
+        async with gate:
+            return await asyncio.to_thread(query, *job)
+
+    return await asyncio.gather(*(one(job) for job in jobs))
+
+def _run(coro):
+    """asyncio.run(coro), also from inside a running event loop (e.g. Jupyter): then in a worker thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+def prefetch(requests, query=None, cache_dir=None, workers=MAX_CONCURRENCY) -> list:
+    """
+    Fill the cache for many (target, location, start, stop, step) requests at
+    once.  Per target / location / step, requested spans and the cached
+    entries they touch are merged into one span; only its uncovered parts are
+    fetched, as chunks of at most CHUNK_ROWS epochs, `workers` at a time; the
+    merged table replaces the entries it absorbed.  Returns the new
+    (entry, table) pairs.
+    """
+    root = Path(cache_dir or EPHEM_DIR)
+    index = _read_json(root / INDEX) or []
+    groups = {}
+    for target, location, start, stop, step in requests:
+        group = (str(target), str(location), str(step))
+        span = _span_jd(start, stop)
+        if _covering(index, group, *span) is None:
+            groups.setdefault(group, []).append(span)
+
+    plans, jobs = [], []
+    for group, spans in groups.items():
+        dt = step_days(group[2])
+        cached = [e for e in index if (e["target"], e["location"], e["step"]) == group]
+        for a, b in _merge(spans + [(e["start_jd"], e["stop_jd"]) for e in cached], dt):
+            if not any(a <= s0 + JD_EPS and s1 <= b + JD_EPS for s0, s1 in spans):
+                continue                                        # only cached entries here
+            inside = sorted((e for e in cached if a - JD_EPS <= e["start_jd"] and e["stop_jd"] <= b + JD_EPS),
+                            key=lambda e: e["start_jd"])
+            tables = []
+            for e in inside:
+                try:
+                    tables.append(load_bundle(root / e["key"]))
+                except (OSError, ValueError, KeyError, TypeError):
+                    pass                                        # torn entry: its span is re-fetched
+            # Uncovered parts of [a, b], on the grid of the cached rows they continue
+            cursor, missing = a, []
+            for t in sorted(tables, key=lambda t: float(t["datetime_jd"].iloc[0]) if len(t) else b):
+                if not len(t):
+                    continue
+                first, last = float(t["datetime_jd"].iloc[0]), float(t["datetime_jd"].iloc[-1])
+                if first > cursor + JD_EPS:
+                    missing.append((cursor, first))
+                cursor = max(cursor, last + dt)
+            if cursor <= b + JD_EPS:
+                missing.append((cursor, b))
+            first_job = len(jobs)
+            for lo, hi in missing:
+                jobs += [(group[0], group[1], _jd_str(c0), _jd_str(c1), group[2]) for c0, c1 in _chunks(lo, hi, dt)]
+            plans.append((group, a, b, [e["key"] for e in inside], tables, slice(first_job, len(jobs))))
+
+    fetched = _run(_fetch_chunks(jobs, query or horizons_query, workers)) if jobs else []
+
+    out = []
+    for (target, location, step), a, b, absorbed, tables, part in plans:
+        table = pd.concat(tables + [_for_bundle(t) for t in fetched[part]], ignore_index=True)
+        table = table.sort_values("datetime_jd", kind="stable")
+        table = _for_bundle(table[~np.round(table["datetime_jd"] * 86_400).duplicated()])
+        entry = {"key": _key(target, location, step, a, b), "target": target, "location": location,
+                 "step": step, "start": _jd_str(a), "stop": _jd_str(b), "start_jd": a, "stop_jd": b,
+                 "rows": len(table)}
+        _save_entry(root, entry, table, absorbed)
+        out.append((entry, table))
+    return out
+
+def _trim(table: pd.DataFrame, span) -> pd.DataFrame:
+    """Rows of a (possibly wider) cached table with start <= datetime_jd <= stop."""
+    jd = table["datetime_jd"].to_numpy(dtype=np.float64)
+    keep = (jd >= span[0] - JD_EPS) & (jd <= span[1] + JD_EPS)
+    return table if keep.all() else table[keep].reset_index(drop=True)
+
+def ephemeris(target, location, start, stop, step="1h", query=None, cache_dir=None) -> Ephemeris:
+    """
+    Ephemeris of `target` seen from `location` over [start, stop] at `step`,
+    from the local cache when a cached span covers it, else fetched (chunked,
+    concurrently) via `query` and merged into the cache.  The table holds
+    only the rows in [start, stop], however wide the cached entry is.
+    """
+    root = Path(cache_dir or EPHEM_DIR)
+    group = (str(target), str(location), str(step))
+    span = _span_jd(start, stop)
+    e = _covering(_read_json(root / INDEX) or [], group, *span)
+    if e is not None:
+        try:
+            return Ephemeris(_trim(load_bundle(root / e["key"]), span), meta=e)
+        except (OSError, ValueError, KeyError, TypeError):
+            shutil.rmtree(root / e["key"], ignore_errors=True)   # torn entry: re-query
+            _write_json(root / INDEX, [x for x in (_read_json(root / INDEX) or []) if x["key"] != e["key"]])
+    for entry, table in prefetch([(target, location, start, stop, step)], query=query, cache_dir=cache_dir):
+        if _covering([entry], group, *span) is not None:
+            return Ephemeris(_trim(table, span), meta=entry)
+    raise RuntimeError(f"no ephemeris rows for {target} @ {location} {start} → {stop}")
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    p = argparse.ArgumentParser(description="Warm / inspect the offline Horizons ephemeris cache.")
+    p.add_argument("target", nargs="?", default="90004574")
+    p.add_argument("location", nargs="?", default="@399", help="observer code(s), comma-separated")
+    p.add_argument("start", nargs="?", default="2025-07-01")
+    p.add_argument("stop", nargs="?", default="2025-12-31")
+    p.add_argument("--step", default="1h")
+    p.add_argument("--list", action="store_true", help="list cached ephemerides and exit")
+    args = p.parse_args()
+
+    if args.list:
+        print(cached_entries().drop(columns=["key", "start_jd", "stop_jd"]).to_string(index=False))
+        raise SystemExit(0)
+
+    locations = args.location.split(",")
+    t0 = time.perf_counter()
+    filled = prefetch([(args.target, loc, args.start, args.stop, args.step) for loc in locations])
+    print(f"🛰️  {len(filled)} span(s) fetched for {args.target} @ {', '.join(locations)} "
+          f"in {(time.perf_counter() - t0)*1e3:.0f} ms ({EPHEM_DIR})")
+    eph = ephemeris(args.target, locations[0], args.start, args.stop, step=args.step)
+    jd = np.random.default_rng(0).uniform(eph.jd[0], eph.jd[-1], 1_000_000)
+    for q in QUANTITIES:
+        if q in eph.table:
+            eph.interpolator(q)
+    t0 = time.perf_counter()
+    geo = eph.at(jd, [q for q in QUANTITIES if q in eph.table])
+    print(f"⚡ {len(geo):,} timestamps × {geo.shape[1] - 1} quantities in "
+          f"{(time.perf_counter() - t0)*1e3:.0f} ms")
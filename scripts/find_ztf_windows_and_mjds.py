@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
-from astroquery.jplhorizons import Horizons
 import pandas as pd
 import numpy as np
 
+from ephem_cache import ephemeris
+
 # --- Parameters you can tweak ---
 OBS = "I41"  # Palomar/ZTF
 START = "2025-11-01"
@@ -12,12 +13,8 @@ EL_MIN = 20.0
 ELONG_MIN = 25.0
 
 print(f"Querying Horizons for {START} → {STOP} @ {OBS} ...")
-obj = Horizons(id="90004574", location=OBS,
-               epochs={"start": START, "stop": STOP, "step": STEP})
-e = obj.ephemerides()
-
-# Convert to DataFrame
-df = e.to_pandas()
+# Offline ephemeris cache: Horizons is only queried the first time
+df = ephemeris("90004574", OBS, START, STOP, step=STEP).table
 
 # Keep only true night (exclude any daylight/twilight keywords)
 sp = df["solar_presence"].astype(str).str.lower()
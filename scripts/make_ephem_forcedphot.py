@@ -1,16 +1,16 @@
 # make_points_for_ztf_queue.py
-from astroquery.jplhorizons import Horizons
 import pandas as pd
 
+from ephem_cache import ephemeris
+
 # 3I/ATLAS (C/2019 Y4) – main fragment id
 TARGET_ID = "90004574"
 # Palomar/ZTF observatory code
 OBS = "I41"
 
 # Query a window straddling post-conjunction
-epochs = {"start":"2025-10-24", "stop":"2025-10-31", "step":"3h"}
-obj = Horizons(id=TARGET_ID, location=OBS, epochs=epochs)
-e = obj.ephemerides()
+# (offline ephemeris cache: Horizons is only queried the first time)
+e = ephemeris(TARGET_ID, OBS, "2025-10-24", "2025-10-31", step="3h").table
 
 # Build dataframe
 df = pd.DataFrame({
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+mpc_cache.py
+Content-addressed columnar cache of parsed MPC observation tables.
+
+A parse of I3.txt (or a full dump) is stored once per file content, keyed by
+the SHA-256 of the raw bytes — the same digest the watcher and the proof
+manifests already record.  Each entry is a directory of one .npy file per
+column plus a small meta.json, so a cache hit is a handful of memory-mapped
+np.load() calls instead of a re-parse:
+
+    <cache>/<sha256>-<obj>/
+        meta.json            columns, dtypes, categories, source digest
+        date_utc.npy         int64 ns since 1970-01-01 UTC
+        mag.npy, ...         plain NumPy columns
+        band.codes.npy, ...  categorical codes (categories live in meta.json)
+
+The cache directory is shared by every script (default ~/.cache/3i_atlas/mpc,
+override with $MPC_CACHE_DIR), so the chained scripts of a release run parse
+the file once.  Least-recently-used entries are evicted once the total size
+exceeds $MPC_CACHE_MAX_MB (default 512 MB).
+
+Usage:
+    from mpc_cache import load_observations
+    obs = load_observations("I3.txt", notes="C")      # same frame as parse_mpc_file
+
+    python mpc_cache.py I3.txt      # warm the cache / show hit timing
+    python mpc_cache.py --clear
+
+Author: Salah-Eddin Gherbi
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mpc_parser import DEFAULT_OBJECT, PARALLEL_MIN_BYTES, compression_of, parse_mpc_bytes, parse_mpc_file
+
+CACHE_VERSION = 2                 # bump when the parser's output columns change
+CACHE_DIR = Path(os.environ.get("MPC_CACHE_DIR", Path.home() / ".cache" / "3i_atlas" / "mpc"))
+MAX_CACHE_BYTES = int(float(os.environ.get("MPC_CACHE_MAX_MB", 512)) * 1024 ** 2)
+STAT_INDEX = "stat_index.json"    # path + size + mtime → sha256, skips re-hashing unchanged files
+
+# ------------------------------------------------------------
+# Digests
+# ------------------------------------------------------------
+def sha256_bytes(buf: bytes) -> str:
+    return hashlib.sha256(buf).hexdigest()
+
+def file_sha256(path, cache_dir=None) -> str:
+    """
+    SHA-256 of a file.  The digest is remembered against (size, mtime_ns, inode)
+    in the cache directory, so an unchanged multi-GB dump is not re-read just
+    to find its key.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    stamp = [st.st_size, st.st_mtime_ns, st.st_ino]
+    index_path = Path(cache_dir or CACHE_DIR) / STAT_INDEX
+    index = _read_json(index_path) or {}
+    hit = index.get(str(path))
+    if hit and hit["stat"] == stamp:
+        return hit["sha256"]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    index[str(path)] = {"stat": stamp, "sha256": digest}
+    _write_json(index_path, index)
+    return digest
+
+def _read_json(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, obj):
+    """Write-then-rename so concurrent scripts never see a torn file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, indent=1))
+    os.replace(tmp, path)
+
+# ------------------------------------------------------------
+# Column bundle (DataFrame ⇄ directory of .npy files)
+# ------------------------------------------------------------
+def save_bundle(df: pd.DataFrame, entry: Path, meta=None):
+    """Write a DataFrame as one .npy per column; categoricals as codes + labels."""
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        spec = {"name": name}
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            spec["kind"] = "category"
+            spec["categories"] = col.cat.categories.tolist()
+            np.save(entry / f"{name}.codes.npy", col.cat.codes.to_numpy())
+        elif isinstance(col.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(col.dtype):
+            spec["kind"] = "datetime"
+            spec["tz"] = str(col.dt.tz) if col.dt.tz is not None else None
+            values = col.dt.tz_localize(None) if col.dt.tz is not None else col
+            np.save(entry / f"{name}.npy", values.to_numpy().astype("datetime64[ns]").view(np.int64))
+        else:
+            spec["kind"] = "array"
+            np.save(entry / f"{name}.npy", col.to_numpy())
+        columns.append(spec)
+    _write_json(entry / "meta.json", {**(meta or {}), "version": CACHE_VERSION,
+                                      "rows": len(df), "columns": columns})
+
+def load_bundle(entry: Path) -> pd.DataFrame:
+    """Rebuild the DataFrame from a bundle; arrays are memory-mapped copy-on-write, not read."""
+    meta = _read_json(entry / "meta.json")
+    if not meta or meta.get("version") != CACHE_VERSION:
+        raise ValueError(f"stale cache entry {entry.name}")
+    data = {}
+    for spec in meta["columns"]:
+        name, kind = spec["name"], spec["kind"]
+        if kind == "category":
+            codes = np.load(entry / f"{name}.codes.npy", mmap_mode="c")
+            data[name] = pd.Categorical.from_codes(codes, categories=spec["categories"])
+        elif kind == "datetime":
+            ns = np.load(entry / f"{name}.npy", mmap_mode="c")
+            idx = pd.DatetimeIndex(ns.view("datetime64[ns]"))
+            data[name] = idx.tz_localize(spec["tz"]) if spec["tz"] else idx
+        else:
+            data[name] = np.load(entry / f"{name}.npy", mmap_mode="c")
+    return pd.DataFrame(data, copy=False)
+
+# ------------------------------------------------------------
+# Cache entries
+# ------------------------------------------------------------
+def _entry_dir(digest, obj, cache_dir=None) -> Path:
+    return Path(cache_dir or CACHE_DIR) / f"{digest}-{obj or 'all'}"
+
+def _entry_size(entry: Path) -> int:
+    return sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+
+def evict(cache_dir=None, max_bytes=None, keep=()):
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    root = Path(cache_dir or CACHE_DIR)
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    if not root.is_dir():
+        return []
+    entries = [e for e in root.iterdir() if (e / "meta.json").is_file()]
+    sizes = {e: _entry_size(e) for e in entries}
+    total = sum(sizes.values())
+    removed = []
+    for e in sorted(entries, key=lambda e: (e / "meta.json").stat().st_mtime):
+        if total <= max_bytes:
+            break
+        if e in keep:
+            continue
+        shutil.rmtree(e, ignore_errors=True)
+        total -= sizes[e]
+        removed.append(e.name)
+    return removed
+
+def _apply_notes(df, notes):
+    if not notes:
+        return df
+    df = df[df["note2"].isin(list(notes))].reset_index(drop=True)
+    # Same categories a direct parse_mpc_file(notes=...) would have produced
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].cat.remove_unused_categories()
+    return df
+
+def _load_entry(entry: Path, notes=None):
+    """Cached frame for `entry`, or None on a miss (torn/stale entries are dropped)."""
+    if not (entry / "meta.json").is_file():
+        return None
+    try:
+        df = load_bundle(entry)
+    except (OSError, ValueError, KeyError, TypeError):
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    try:
+        os.utime(entry / "meta.json")              # LRU stamp
+    except OSError:
+        pass                                       # read-only / shared cache
+    return _apply_notes(df, notes)
+
+def _store_entry(buf, entry: Path, obj, digest, cache_dir=None, path=None, workers=1) -> pd.DataFrame:
+    pool = (workers or os.cpu_count() or 1) != 1 and buf is not None and len(buf) >= PARALLEL_MIN_BYTES
+    if path is not None and (buf is None or pool):
+        df = parse_mpc_file(path, obj=obj, workers=workers)    # archives: streaming; large files: pool
+    else:
+        df = parse_mpc_bytes(buf, obj=obj)
+    tmp = entry.with_name(f".{entry.name}.{os.getpid()}.tmp")
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        save_bundle(df, tmp, meta={"sha256": digest, "obj": obj})
+        os.replace(tmp, entry)
+    except OSError:
+        pass                                       # another process won the race / read-only cache
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict(cache_dir, keep={entry})
+    return df
+
+def cached_parse(buf: bytes, obj=DEFAULT_OBJECT, notes=None, digest=None, cache_dir=None) -> pd.DataFrame:
+    """
+    parse_mpc_bytes() through the cache.  The entry holds every record of `obj`;
+    the note-2 filter is applied on load so 'C'-only and all-notes callers
+    share one entry.
+    """
+    digest = digest or sha256_bytes(buf)
+    entry = _entry_dir(digest, obj, cache_dir)
+    df = _load_entry(entry, notes)
+    if df is None:
+        df = _apply_notes(_store_entry(buf, entry, obj, digest, cache_dir), notes)
+    return df
+
+def load_observations(path="I3.txt", obj=DEFAULT_OBJECT, notes=None, digest=None, cache_dir=None,
+                      workers=None) -> pd.DataFrame:
+    """
+    Cached drop-in for mpc_parser.parse_mpc_file().  Pass `digest` when the
+    caller has already hashed the file (e.g. for a proof manifest).  On a miss,
+    files above PARALLEL_MIN_BYTES are parsed with `workers` processes (None = all cores)
+    and gzip/bz2/xz/zstd archives are parsed as they stream out of the decompressor.
+    """
+    digest = digest or file_sha256(path, cache_dir)
+    df = _load_entry(_entry_dir(digest, obj, cache_dir), notes)
+    if df is None and compression_of(path) is not None:
+        # Archives are stream-decompressed into the parser, keyed by the archive's digest
+        entry = _entry_dir(digest, obj, cache_dir)
+        df = _apply_notes(_store_entry(None, entry, obj, digest, cache_dir, path=path, workers=workers), notes)
+    elif df is None:
+        buf = Path(path).read_bytes()
+        digest = sha256_bytes(buf)                 # key by what was actually read
+        entry = _entry_dir(digest, obj, cache_dir)
+        df = _apply_notes(_store_entry(buf, entry, obj, digest, cache_dir, path=path, workers=workers), notes)
+    return df
+
+def clear(cache_dir=None):
+    shutil.rmtree(Path(cache_dir or CACHE_DIR), ignore_errors=True)
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if "--clear" in sys.argv:
+        clear()
+        print(f"🧹 Cleared {CACHE_DIR}")
+        sys.exit(0)
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "I3.txt"
+    for label in ("first", "second"):
+        t0 = time.perf_counter()
+        df = load_observations(path, obj=None)
+        dt = time.perf_counter() - t0
+        print(f"📦 {label} load: {len(df)} records from {path} in {dt*1e3:.1f} ms")
+    print(f"🗂️  Cache: {CACHE_DIR}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+mpc_fetch.py
+Conditional, ranged HTTP fetches of a growing MPC file (--url sources).
+
+Every fetched URL is mirrored on disk next to the parse cache:
+
+    <cache>/url/<sha256(url)[:16]>.txt     bytes received so far
+    <cache>/url/<sha256(url)[:16]>.json    url, ETag, Last-Modified, length
+
+A refresh is one GET on a pooled keep-alive session carrying
+If-None-Match / If-Modified-Since and, when a mirror exists,
+Range: bytes=<length - OVERLAP>- :
+
+    304                 unchanged, the mirror is returned as is
+    206                 only the appended tail crosses the wire; the OVERLAP
+                        bytes it re-sends must equal the mirror's last bytes,
+                        otherwise the file was rewritten → full fetch
+    200                 server ignores Range (or the resource changed shape):
+                        streamed in full, replacing the mirror
+    416                 file shrank → full fetch
+
+Bodies are streamed in chunks straight to the mirror and returned as raw
+bytes, which go to the bytes parser (mpc_parser.parse_mpc_bytes) without a
+str decode.  Ranged requests ask for identity encoding so byte offsets are
+offsets into the file.
+
+Usage:
+    from mpc_fetch import fetch_url
+    buf, status = fetch_url("https://example/I3.txt")   # status: full / appended / unchanged
+
+    python mpc_fetch.py https://example/I3.txt
+
+Author: Salah-Eddin Gherbi
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from mpc_cache import CACHE_DIR, _read_json, _write_json
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    requests = None
+
+CHUNK_BYTES = 1 << 16
+OVERLAP = 4096              # bytes re-fetched before the mirror's end to detect rewrites
+TIMEOUT = 30
+
+_SESSION = None
+
+def session():
+    """Process-wide keep-alive session (connection pool + retries on transient errors)."""
+    global _SESSION
+    if requests is None:
+        raise ImportError("'requests' not installed; either install it or use --file.")
+    if _SESSION is None:
+        _SESSION = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        _SESSION.mount("https://", adapter)
+        _SESSION.mount("http://", adapter)
+    return _SESSION
+
+def mirror_paths(url, cache_dir=None):
+    key = hashlib.sha256(url.encode()).hexdigest()[:16]
+    root = Path(cache_dir or CACHE_DIR) / "url"
+    return root / f"{key}.txt", root / f"{key}.json"
+
+def _stream(resp, f) -> int:
+    n = 0
+    for chunk in resp.iter_content(CHUNK_BYTES):
+        f.write(chunk)
+        n += len(chunk)
+    return n
+
+def _save_meta(meta_path, url, resp, length):
+    _write_json(meta_path, {
+        "url": url,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "length": length,
+    })
+
+def _fetch_full(url, data_path, meta_path, timeout):
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = data_path.with_name(f".{data_path.name}.{os.getpid()}.tmp")
+    with session().get(url, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        with open(tmp, "wb") as f:
+            length = _stream(resp, f)
+        os.replace(tmp, data_path)
+    _save_meta(meta_path, url, resp, length)
+    return data_path.read_bytes(), "full"
+
+def fetch_url(url, cache_dir=None, timeout=TIMEOUT):
+    """
+    (bytes, status) of the resource, transferring as little as the server
+    allows.  status is 'unchanged', 'appended' or 'full'.
+    """
+    data_path, meta_path = mirror_paths(url, cache_dir)
+    meta = _read_json(meta_path)
+    if not meta or not data_path.is_file() or data_path.stat().st_size != meta.get("length"):
+        return _fetch_full(url, data_path, meta_path, timeout)
+
+    have = meta["length"]
+    start = max(have - OVERLAP, 0)
+    headers = {"Range": f"bytes={start}-", "Accept-Encoding": "identity"}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    with session().get(url, headers=headers, stream=True, timeout=timeout) as resp:
+        if resp.status_code == 304:
+            return data_path.read_bytes(), "unchanged"
+        if resp.status_code == 416:
+            return _fetch_full(url, data_path, meta_path, timeout)
+        resp.raise_for_status()
+        if resp.status_code != 206 or not resp.headers.get("Content-Range", "").startswith(f"bytes {start}-"):
+            # Full body (no Range support): stream it over the mirror
+            tmp = data_path.with_name(f".{data_path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                length = _stream(resp, f)
+            os.replace(tmp, data_path)
+            _save_meta(meta_path, url, resp, length)
+            return data_path.read_bytes(), "full"
+
+        chunks = resp.iter_content(CHUNK_BYTES)
+        head = b""
+        for chunk in chunks:                       # collect the overlap first
+            head += chunk
+            if len(head) >= have - start:
+                break
+        with open(data_path, "rb") as f:
+            f.seek(start)
+            expected = f.read(have - start)
+        if head[:have - start] != expected:
+            resp.close()
+            return _fetch_full(url, data_path, meta_path, timeout)
+
+        with open(data_path, "r+b") as f:
+            f.seek(have)
+            f.truncate()
+            f.write(head[have - start:])
+            length = have + len(head) - (have - start)
+            for chunk in chunks:
+                f.write(chunk)
+                length += len(chunk)
+    _save_meta(meta_path, url, resp, length)
+    return data_path.read_bytes(), ("appended" if length > have else "unchanged")
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    url = sys.argv[1]
+    for label in ("first", "second"):
+        t0 = time.perf_counter()
+        buf, status = fetch_url(url)
+        dt = time.perf_counter() - t0
+        print(f"🌐 {label} fetch: {status}, {len(buf)} bytes in {dt*1e3:.0f} ms")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+mpc_partition.py
+Stream a full MPC observation dump (many objects) into per-object columnar shards.
+
+The dump is cut into fixed-size blocks on line boundaries, so memory stays
+bounded by BLOCK_BYTES (times the number of blocks in flight) no matter how
+large the file is.  Blocks are parsed by the vectorized parser — in a process
+pool with --workers — and consumed in file order; each block's rows are split
+by packed designation and each object's slice is appended column by column to
+raw binary files:
+
+    <out>/index.json                 designation → rows, date span, stations, shard dir
+    <out>/<dir>/meta.json            column dtypes
+    <out>/<dir>/<column>.bin         fixed-dtype column, appended block by block
+
+Packed designations differ only by case (A0001 is 100001, a0001 is 360001),
+so <dir> is a case-safe name (shard_dir(): '_' before each lower-case
+letter, other characters as -XX hex, '_blank' for an empty designation);
+index.json maps every designation to its directory.
+
+Categoricals (band, station, note2) are stored as fixed-width bytes so blocks
+append without a shared code table; load_shard() rebuilds the same DataFrame
+parse_mpc_file() gives for that object.
+
+Usage:
+    python mpc_partition.py NumObs.txt shards/        # partition a dump
+    python mpc_partition.py NumObs.txt shards/ --workers 16
+    python mpc_partition.py NumObs.txt.gz shards/     # gzip/bz2/xz/zstd: streamed, no temp copy
+    python mpc_partition.py --list shards/            # show the designation index
+
+    from mpc_partition import load_shard, read_index
+    obs = load_shard("shards", "0003I", notes="C")
+
+Author: Salah-Eddin Gherbi
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mpc_parser import COLUMNS, RECORD_LEN, compression_of, iter_line_blocks, line_spans, parse_blocks, parse_spans
+
+BLOCK_BYTES = 64 * 1024 * 1024    # read size; peak memory is a small multiple of this
+INDEX_FILE = "index.json"
+
+# Fixed on-disk dtype of every shard column ("desig" is implied by the shard)
+SHARD_DTYPES = {
+    "date_utc": "<i8",            # ns since 1970-01-01 UTC (NaT = int64 min)
+    "mjd": "<f8",
+    "year": "<i2",
+    "month": "i1",
+    "day": "<f8",
+    "ra_deg": "<f8",
+    "dec_deg": "<f8",
+    "mag": "<f8",
+    "mag_decimals": "i1",
+    "band": "S1",
+    "station": "S3",
+    "note2": "S1",
+}
+CATEGORICAL = ("band", "station", "note2")
+
+# ------------------------------------------------------------
+# Shard writing
+# ------------------------------------------------------------
+def _column_bytes(df: pd.DataFrame, name: str) -> bytes:
+    col = df[name]
+    dtype = np.dtype(SHARD_DTYPES[name])
+    if name == "date_utc":
+        values = col.dt.tz_localize(None).to_numpy().astype("datetime64[ns]").view(np.int64)
+    elif name in CATEGORICAL:
+        # encode the few category labels once, then gather by code
+        labels = np.array(col.cat.categories.tolist() + [""], dtype=dtype)
+        values = labels[col.cat.codes.to_numpy()]
+    else:
+        values = col.to_numpy()
+    return np.asarray(values, dtype=dtype).tobytes()
+
+def shard_dir(desig: str) -> str:
+    """Directory name of a designation that stays distinct on case-insensitive filesystems."""
+    if not desig:
+        return "_blank"
+    return "".join(c if c.isascii() and (c.isupper() or c.isdigit()) else
+                   f"_{c}" if c.isascii() and c.islower() else
+                   "".join(f"-{b:02x}" for b in c.encode()) for c in desig)
+
+def _append_shard(shard: Path, df: pd.DataFrame):
+    if not shard.exists():
+        shard.mkdir(parents=True)
+        (shard / "meta.json").write_text(json.dumps({"dtypes": SHARD_DTYPES}, indent=1))
+    for name in SHARD_DTYPES:
+        with open(shard / f"{name}.bin", "ab") as f:
+            f.write(_column_bytes(df, name))
+
+def _update_index(index: dict, desig: str, df: pd.DataFrame):
+    station = df["station"]
+    stations = set(station.cat.categories[np.unique(station.cat.codes.to_numpy())])
+    entry = index.setdefault(desig, {"dir": shard_dir(desig), "rows": 0, "first": None, "last": None, "stations": []})
+    entry["rows"] += len(df)
+    dates = df["date_utc"]
+    if dates.notna().any():
+        lo, hi = dates.min().isoformat(), dates.max().isoformat()
+        entry["first"] = lo if entry["first"] is None else min(entry["first"], lo)
+        entry["last"] = hi if entry["last"] is None else max(entry["last"], hi)
+    entry["stations"] = sorted(stations.union(entry["stations"]))
+
+def partition_dump(path, out_dir, block_bytes=BLOCK_BYTES, workers=1, verbose=True) -> dict:
+    """
+    Partition an MPC dump into per-designation shards under out_dir.
+    The shards are built in a sibling temp directory and swapped in at the end,
+    so a crashed run never leaves a half-written index behind.
+    """
+    out_dir = Path(out_dir)
+    tmp = out_dir.with_name(f".{out_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    index, n_bytes, n_rows = {}, 0, 0
+    if compression_of(path) is not None:
+        # Archive: decompress in line-aligned blocks straight into the parser
+        parts = parse_blocks(iter_line_blocks(path, block_bytes), obj=None, workers=workers)
+    else:
+        spans = line_spans(path, block_bytes)
+        parts = ((stop - start, df) for (start, stop), df in zip(spans, parse_spans(path, spans, obj=None, workers=workers)))
+    for size, df in parts:
+        n_bytes += size
+        if df.empty:
+            continue
+        codes = df["desig"].cat.codes.to_numpy()
+        order = np.argsort(codes, kind="stable")   # dumps are grouped by object: near-sorted already
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for rows in np.split(order, bounds):
+            desig = df["desig"].cat.categories[codes[rows[0]]]
+            part = df.iloc[rows]
+            _append_shard(tmp / shard_dir(desig), part)
+            _update_index(index, desig, part)
+        n_rows += len(df)
+        if verbose:
+            print(f"   … {n_bytes / 1e6:,.0f} MB, {n_rows:,} records, {len(index):,} objects")
+
+    meta = {"source": str(Path(path).resolve()), "bytes": n_bytes, "rows": n_rows, "objects": index}
+    (tmp / INDEX_FILE).write_text(json.dumps(meta, indent=1))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return meta
+
+# ------------------------------------------------------------
+# Shard reading
+# ------------------------------------------------------------
+def read_index(out_dir) -> pd.DataFrame:
+    """Designation index as a DataFrame (one row per object)."""
+    meta = json.loads((Path(out_dir) / INDEX_FILE).read_text())
+    rows = [{"desig": d, **{k: v for k, v in e.items() if k != "stations"},
+             "n_stations": len(e["stations"])} for d, e in meta["objects"].items()]
+    return pd.DataFrame(rows, columns=["desig", "dir", "rows", "first", "last", "n_stations"])
+
+def load_shard(out_dir, desig, notes=None) -> pd.DataFrame:
+    """
+    One object's observations, memory-mapped from its shard, with the same
+    columns as mpc_parser.parse_mpc_file().  notes filters note-2 codes.
+    """
+    meta = json.loads((Path(out_dir) / INDEX_FILE).read_text())
+    shard = Path(out_dir) / meta["objects"][desig]["dir"]
+    cols = {}
+    for name, dtype in SHARD_DTYPES.items():
+        path = shard / f"{name}.bin"
+        raw = np.memmap(path, dtype=dtype, mode="c") if path.stat().st_size else np.empty(0, dtype)
+        if name == "date_utc":
+            cols[name] = pd.DatetimeIndex(raw.view("datetime64[ns]")).tz_localize("UTC")
+        elif name in CATEGORICAL:
+            labels = np.char.decode(raw, "ascii")
+            cols[name] = pd.Categorical(np.char.strip(labels))
+        else:
+            cols[name] = raw
+    n = len(cols["mjd"])
+    cols["desig"] = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[desig])
+    df = pd.DataFrame(cols, copy=False)[COLUMNS]
+    if notes:
+        df = df[df["note2"].isin(list(notes))].reset_index(drop=True)
+        for name in CATEGORICAL:
+            df[name] = df[name].cat.remove_unused_categories()
+    return df
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] == "--list":
+        print(read_index(args[1]).to_string(index=False))
+        sys.exit(0)
+    workers = 1
+    if "--workers" in args:
+        k = args.index("--workers")
+        workers = int(args[k + 1])
+        del args[k:k + 2]
+    if len(args) != 2:
+        print("Usage: python mpc_partition.py DUMP.txt OUT_DIR [--workers N] | --list OUT_DIR")
+        sys.exit(1)
+
+    src, out = args
+    print(f"📂 Partitioning {src} → {out}/ ({RECORD_LEN}-column records, "
+          f"{BLOCK_BYTES >> 20} MB blocks, {workers} worker(s))")
+    t0 = time.perf_counter()
+    meta = partition_dump(src, out, workers=workers)
+    dt = time.perf_counter() - t0
+    print(f"✅ {meta['rows']:,} records across {len(meta['objects']):,} objects "
+          f"in {dt:.1f} s ({meta['bytes'] / 1e6 / max(dt, 1e-9):,.0f} MB/s)")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+obs_codes.py
+MPC observatory codes and topocentric per-station geometry.
+
+The MPC list of observatory codes (ObsCodes.html) gives, per station, the
+east longitude and the parallax constants rho·cos(phi') and rho·sin(phi')
+(geocentric latitude phi', Earth radii) in fixed columns:
+
+    Code  Long.   cos      sin    Name
+    I41 243.1403 0.836325+0.546877 Palomar Mountain--ZTF
+
+ObsCodes holds them as sorted arrays, so a column of station codes maps to
+table rows with one searchsorted over its distinct codes.  Space-based and
+roving codes (no constants) have NaN and fall back to geocentric geometry.
+
+topocentric() places every observer at its station for its time (Greenwich
+mean sidereal time + station longitude), and one vectorized pass of the
+two-body model (two_body.geometry) gives topocentric r, delta, phase angle,
+elongation, RA/Dec, plus altitude and airmass (Kasten & Young 1989).  Tens of
+thousands of observations from hundreds of stations need no Horizons query.
+
+The table is read from a local ObsCodes.html / .txt, or fetched from the MPC
+with mpc_fetch (mirrored, conditional GET) and parsed once per process.
+
+Usage:
+    from obs_codes import load_obscodes, topocentric
+    codes = load_obscodes()                             # $OBSCODES_FILE or the MPC list
+    geo = topocentric(obs["date_utc"], obs["station"], codes)
+
+    python obs_codes.py I3.txt [ObsCodes.html]          # per-station geometry summary
+
+Author: Salah-Eddin Gherbi
+"""
+
+import io
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ephem_cache import to_jd
+from two_body import ELEMENTS_3I, JD_J2000, equatorial_to_ecliptic, geometry
+
+OBSCODES_URL = "https://minorplanetcenter.net/iau/lists/ObsCodes.html"
+OBSCODES_FILE = os.environ.get("OBSCODES_FILE")
+EARTH_RADIUS_AU = 6378.137 / 149_597_870.7
+COLSPECS = [(0, 3), (4, 13), (13, 21), (21, 30), (30, None)]
+
+class ObsCodes:
+    """Observatory codes as sorted arrays: code, lon (deg east), rho_cos, rho_sin, name."""
+
+    def __init__(self, table: pd.DataFrame):
+        table = table.sort_values("code", kind="stable").drop_duplicates("code", keep="last")
+        self.code = table["code"].to_numpy(dtype=str)
+        self.lon = table["lon"].to_numpy(dtype=np.float64)
+        self.rho_cos = table["rho_cos"].to_numpy(dtype=np.float64)
+        self.rho_sin = table["rho_sin"].to_numpy(dtype=np.float64)
+        self.name = table["name"].to_numpy(dtype=str)
+
+    def __len__(self):
+        return len(self.code)
+
+    @classmethod
+    def from_text(cls, text: str):
+        """Parse ObsCodes.html (the <pre> block) or the plain-text list."""
+        body = re.search(r"<pre>(.*?)</pre>", text, re.S | re.I)
+        lines = [ln for ln in (body.group(1) if body else text).splitlines()
+                 if len(ln) >= 3 and not ln.startswith("Code")]
+        table = pd.read_fwf(io.StringIO("\n".join(lines)), colspecs=COLSPECS, header=None,
+                            names=["code", "lon", "rho_cos", "rho_sin", "name"],
+                            dtype={"code": str, "name": str})
+        for col in ("lon", "rho_cos", "rho_sin"):
+            table[col] = pd.to_numeric(table[col], errors="coerce")
+        table["name"] = table["name"].fillna("")
+        return cls(table)
+
+    def index(self, stations) -> np.ndarray:
+        """Row of every station code (-1 if unknown); one lookup per distinct code."""
+        cat = pd.Categorical(np.asarray(stations, dtype=str))
+        keys = np.asarray(cat.categories, dtype=str)
+        rows = np.full(len(keys), -1)
+        if len(self.code) and len(keys):
+            pos = np.minimum(np.searchsorted(self.code, keys), len(self.code) - 1)
+            rows = np.where(self.code[pos] == keys, pos, -1)
+        return np.where(cat.codes >= 0, rows[cat.codes], -1)
+
+    def table(self) -> pd.DataFrame:
+        return pd.DataFrame({"code": self.code, "lon": self.lon, "rho_cos": self.rho_cos,
+                             "rho_sin": self.rho_sin, "name": self.name})
+
+_LOADED = {}
+
+def load_obscodes(source=None) -> ObsCodes:
+    """ObsCodes from a local file, or from the MPC list (mirrored by mpc_fetch)."""
+    source = source or OBSCODES_FILE or OBSCODES_URL
+    if source not in _LOADED:
+        if re.match(r"https?://", str(source)):
+            from mpc_fetch import fetch_url
+            buf, _ = fetch_url(source)
+        else:
+            buf = Path(source).read_bytes()
+        _LOADED[source] = ObsCodes.from_text(buf.decode("utf-8", errors="replace"))
+    return _LOADED[source]
+
+# ------------------------------------------------------------
+# Topocentric geometry
+# ------------------------------------------------------------
+def gmst_deg(jd) -> np.ndarray:
+    """Greenwich mean sidereal time (deg) at UT Julian dates."""
+    d = np.asarray(jd, dtype=np.float64) - JD_J2000
+    T = d / 36525
+    return np.mod(280.46061837 + 360.98564736629 * d + 0.000387933 * T * T, 360)
+
+def airmass(alt_deg) -> np.ndarray:
+    """Kasten & Young (1989) relative airmass; NaN below the horizon."""
+    alt = np.asarray(alt_deg, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        x = 1 / (np.sin(np.radians(alt)) + 0.50572 * (alt + 6.07995) ** -1.6364)
+    return np.where(alt > 0, x, np.nan)
+
+def altitude(ra_deg, dec_deg, lst, lat) -> np.ndarray:
+    """Altitude (deg) of RA/Dec (deg) at local sidereal time `lst` and geocentric latitude `lat` (rad)."""
+    ra, dec = np.radians(ra_deg), np.radians(dec_deg)
+    sin_alt = np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(lst - ra)
+    return np.degrees(np.arcsin(np.clip(sin_alt, -1, 1)))
+
+def topocentric(t, stations, codes: ObsCodes, elements=ELEMENTS_3I) -> pd.DataFrame:
+    """
+    Geometry of every observation from its own station: jd, r, delta, alpha,
+    elong, RA, DEC (as two_body.geometry), alt, airmass and `topo` (False where
+    the station has no parallax constants and the values are geocentric).
+    """
+    jd = to_jd(t)
+    row = codes.index(stations)                       # -1 (unknown) picks the NaN sentinel
+    rho_cos, rho_sin, lon = (np.r_[a, np.nan][row] for a in (codes.rho_cos, codes.rho_sin, codes.lon))
+    topo = np.isfinite(rho_cos) & np.isfinite(rho_sin) & np.isfinite(lon)
+
+    # Observer offset from the geocentre: equatorial (of date ≈ J2000 at this precision) → ecliptic
+    lst = np.radians(gmst_deg(jd) + np.where(topo, lon, 0))
+    eq = EARTH_RADIUS_AU * np.stack([np.where(topo, rho_cos, 0) * np.cos(lst),
+                                     np.where(topo, rho_cos, 0) * np.sin(lst),
+                                     np.where(topo, rho_sin, 0)], axis=1)
+    geo = geometry(jd, elements, observer=equatorial_to_ecliptic(eq))
+
+    # Altitude from hour angle and geocentric latitude
+    alt = altitude(geo["RA"].to_numpy(), geo["DEC"].to_numpy(), lst, np.arctan2(rho_sin, rho_cos))
+    alt = np.where(topo, alt, np.nan)
+    geo["alt"] = alt
+    geo["airmass"] = airmass(alt)
+    geo["topo"] = topo
+    return geo
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from mpc_cache import load_observations
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "I3.txt"
+    codes = load_obscodes(sys.argv[2] if len(sys.argv) > 2 else None)
+    obs = load_observations(path)
+    t0 = time.perf_counter()
+    geo = topocentric(obs["date_utc"], obs["station"], codes)
+    dt = time.perf_counter() - t0
+    print(f"🔭 Topocentric geometry for {len(geo)} observations from {obs['station'].nunique()} stations "
+          f"({len(codes)} codes) in {dt*1e3:.1f} ms; {(~geo['topo']).sum()} geocentric fallbacks")
+
+    per_station = geo.assign(station=obs["station"].astype(str)).groupby("station").agg(
+        n=("jd", "size"), delta=("delta", "median"), alpha=("alpha", "median"),
+        alt=("alt", "median"), airmass=("airmass", "median"))
+    print(per_station.sort_values("n", ascending=False).head(15).round(3).to_string())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+obs_store.py
+Compact typed observation store: one packed NumPy record per observation.
+
+    field     dtype    meaning
+    t         int64    ns since 1970-01-01 UTC
+    mag       float32  magnitude (NaN = none reported)
+    band      uint8    code into ObsStore.bands     ('g', 'o', 'G', ...)
+    station   uint16   code into ObsStore.stations  ('703', 'T08', ...)
+    note2     uint8    code into ObsStore.notes     ('C', 'B', ...)
+    mag_dec   int8     decimals the magnitude was reported with
+    desig     uint32   code into ObsStore.desigs    ('0003I', 'CK25N010', ...)
+
+21 bytes per observation instead of a DataFrame row of 64-bit floats and
+Python strings, so large dumps stay in memory and group-bys become integer
+bincount/sort operations on the code columns.  The lookup tables are plain
+string arrays; decode with store.bands[store.band].
+
+store.index("night"), store.index("station", "night", "band"), ... are
+sorted inverted indexes (a row permutation + per-key offsets), built once per
+store and cached: every night's / station's / band's rows are one slice, so
+pairing and binning code does lookups instead of full-table boolean masks.
+
+Usage:
+    from obs_store import ObsStore
+    store = ObsStore.from_mpc_file("I3.txt", notes="C")
+    store = store.select((store.mag_dec == 2) & ~np.isnan(store.mag)).map_bands(str.lower)
+    g = store.band == store.band_code("g")
+    for night, rows in store.index("night"):            # rows: indices into store.obs
+        ...
+
+Author: Salah-Eddin Gherbi
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mpc_cache import load_observations
+from mpc_parser import DEFAULT_OBJECT, NS_PER_DAY
+
+OBS_DTYPE = np.dtype([
+    ("t", "<i8"),
+    ("mag", "<f4"),
+    ("band", "u1"),
+    ("station", "<u2"),
+    ("note2", "u1"),
+    ("mag_dec", "i1"),
+    ("desig", "<u4"),
+])
+
+_LOOKUPS = ("bands", "stations", "notes", "desigs")
+
+class GroupIndex:
+    """
+    Rows of a store grouped by key fields: order[offsets[i]:offsets[i+1]]
+    are the rows whose key is (keys[f][i] for f in fields).  Keys ascend in
+    np.lexsort order (first field primary); rows keep store order within a key.
+    """
+
+    def __init__(self, fields, columns):
+        self.fields = tuple(fields)
+        self.order = np.lexsort(columns[::-1])
+        cols = [c[self.order] for c in columns]
+        change = np.zeros(len(self.order), dtype=bool)
+        change[:1] = True
+        for c in cols:
+            change[1:] |= c[1:] != c[:-1]
+        starts = np.flatnonzero(change)
+        self.offsets = np.r_[starts, len(self.order)].astype(np.intp)
+        self.keys = {f: c[starts] for f, c in zip(self.fields, cols)}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        """(key, rows) per group; key is a scalar for one-field indexes, else a tuple."""
+        keys = [self.keys[f] for f in self.fields]
+        for i in range(len(self)):
+            key = tuple(k[i] for k in keys)
+            yield (key[0] if len(key) == 1 else key), self.order[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def group_of_sorted(self) -> np.ndarray:
+        """Group number of every row in index order (order[j] belongs to group_of_sorted()[j])."""
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def span(self, lo, hi=None) -> slice:
+        """Slice of `order` holding keys lo ≤ key ≤ hi (single-field indexes)."""
+        (keys,) = self.keys.values()
+        a = np.searchsorted(keys, lo, side="left")
+        b = np.searchsorted(keys, lo if hi is None else hi, side="right")
+        return slice(self.offsets[a], self.offsets[b])
+
+    def rows(self, lo, hi=None) -> np.ndarray:
+        """Store rows with lo ≤ key ≤ hi (single-field indexes)."""
+        return self.order[self.span(lo, hi)]
+
+    def sum(self, values) -> np.ndarray:
+        """Per-group sum of a per-row array."""
+        v = np.asarray(values, dtype=np.float64)[self.order]
+        return np.add.reduceat(v, self.offsets[:-1]) if len(self) else np.empty(0)
+
+    def mean(self, values) -> np.ndarray:
+        return self.sum(values) / self.counts
+
+    def std(self, values, ddof=1) -> np.ndarray:
+        """Per-group standard deviation (two-pass, NaN where count ≤ ddof)."""
+        v = np.asarray(values, dtype=np.float64)
+        dev = v[self.order] - np.repeat(self.mean(v), self.counts)
+        ss = np.add.reduceat(dev * dev, self.offsets[:-1]) if len(self) else np.empty(0)
+        n = self.counts - ddof
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(n > 0, np.sqrt(ss / n), np.nan)
+
+class ObsStore:
+    """Structured observation array + lookup tables for its categorical codes."""
+
+    def __init__(self, obs: np.ndarray, bands, stations, notes, desigs):
+        self.obs = obs
+        self._indexes = {}
+        self.bands = np.asarray(bands, dtype=str)
+        self.stations = np.asarray(stations, dtype=str)
+        self.notes = np.asarray(notes, dtype=str)
+        self.desigs = np.asarray(desigs, dtype=str)
+
+    # ---------------- construction ----------------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ObsStore":
+        """Build from a parse_mpc_file()/read_ades() frame (categorical columns)."""
+        obs = np.empty(len(df), dtype=OBS_DTYPE)
+        obs["t"] = df["date_utc"].dt.tz_localize(None).to_numpy().astype("datetime64[ns]").view(np.int64)
+        obs["mag"] = df["mag"].to_numpy(dtype=np.float32)
+        obs["mag_dec"] = df["mag_decimals"].to_numpy()
+        lookups = {}
+        for field, col, name, limit in (("band", "band", "bands", 0xFF),
+                                        ("station", "station", "stations", 0xFFFF),
+                                        ("note2", "note2", "notes", 0xFF),
+                                        ("desig", "desig", "desigs", 0xFFFFFFFF)):
+            cat = df[col].astype("category")
+            if len(cat.cat.categories) > limit:
+                raise ValueError(f"{len(cat.cat.categories)} {name} do not fit in {obs.dtype[field]}")
+            obs[field] = cat.cat.codes.to_numpy()
+            lookups[name] = cat.cat.categories.astype(str)
+        return cls(obs, **lookups)
+
+    @classmethod
+    def from_mpc_file(cls, path="I3.txt", obj=DEFAULT_OBJECT, notes=None) -> "ObsStore":
+        """Parse (or load from the content-addressed cache) and pack."""
+        return cls.from_frame(load_observations(path, obj=obj, notes=notes))
+
+    # ---------------- persistence ----------------
+    def save(self, path):
+        """Write as a single .npz (no pickles)."""
+        np.savez(path, obs=self.obs, **{k: getattr(self, k) for k in _LOOKUPS})
+
+    @classmethod
+    def load(cls, path) -> "ObsStore":
+        with np.load(Path(path)) as z:
+            return cls(z["obs"], *(z[k] for k in _LOOKUPS))
+
+    # ---------------- columns ----------------
+    def __len__(self):
+        return len(self.obs)
+
+    @property
+    def nbytes(self) -> int:
+        return self.obs.nbytes + sum(getattr(self, k).nbytes for k in _LOOKUPS)
+
+    @property
+    def t(self):
+        return self.obs["t"]
+
+    @property
+    def mag(self):
+        return self.obs["mag"]
+
+    @property
+    def mag64(self) -> np.ndarray:
+        """float64 magnitudes identical to the parser's: float32 keeps every
+        reported digit, so re-rounding to mag_dec decimals restores them."""
+        scale = 10.0 ** self.mag_dec.astype(np.float64)
+        return np.rint(self.mag.astype(np.float64) * scale) / scale
+
+    @property
+    def band(self):
+        return self.obs["band"]
+
+    @property
+    def station(self):
+        return self.obs["station"]
+
+    @property
+    def note2(self):
+        return self.obs["note2"]
+
+    @property
+    def mag_dec(self):
+        return self.obs["mag_dec"]
+
+    @property
+    def desig(self):
+        return self.obs["desig"]
+
+    @property
+    def night(self) -> np.ndarray:
+        """UTC day number (days since 1970-01-01), i.e. date_utc.dt.floor('D')."""
+        return np.floor_divide(self.t, NS_PER_DAY)
+
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.t.view("datetime64[ns]")).tz_localize("UTC")
+
+    def column(self, field: str) -> np.ndarray:
+        """A record field, or the derived 'night' day number."""
+        return self.night if field == "night" else self.obs[field]
+
+    # ---------------- indexes ----------------
+    def index(self, *fields) -> GroupIndex:
+        """Sorted inverted index over fields ('night', 'station', 'band', ...), cached."""
+        if fields not in self._indexes:
+            self._indexes[fields] = GroupIndex(fields, [self.column(f) for f in fields])
+        return self._indexes[fields]
+
+    # ---------------- lookups ----------------
+    @staticmethod
+    def _code(table, label) -> int:
+        hit = np.flatnonzero(table == label)
+        return int(hit[0]) if hit.size else -1
+
+    def band_code(self, band: str) -> int:
+        """Code of a band label, -1 if absent (compares False against every row)."""
+        return self._code(self.bands, band)
+
+    def station_code(self, station: str) -> int:
+        return self._code(self.stations, station)
+
+    def note_code(self, note: str) -> int:
+        return self._code(self.notes, note)
+
+    def band_isin(self, labels) -> np.ndarray:
+        return np.isin(self.bands, list(labels))[self.band]
+
+    # ---------------- derived stores ----------------
+    def select(self, mask) -> "ObsStore":
+        """Rows where mask is True; lookup tables are shared, codes unchanged."""
+        return ObsStore(self.obs[mask], self.bands, self.stations, self.notes, self.desigs)
+
+    def sorted_by(self, *fields) -> "ObsStore":
+        """Stable sort by fields, last one primary (np.lexsort order)."""
+        return self.select(np.lexsort([self.obs[f] for f in fields]))
+
+    def map_bands(self, fn) -> "ObsStore":
+        """Relabel bands (e.g. str.lower), merging labels that collide."""
+        labels, remap = np.unique([fn(b) for b in self.bands], return_inverse=True)
+        obs = self.obs.copy()
+        obs["band"] = remap.astype(np.uint8)[obs["band"]]
+        return ObsStore(obs, labels, self.stations, self.notes, self.desigs)
+
+    def categorical(self, field: str) -> pd.Categorical:
+        """A code column as a pandas Categorical over its lookup table (no string copies)."""
+        table = {"band": self.bands, "station": self.stations,
+                 "note2": self.notes, "desig": self.desigs}[field]
+        return pd.Categorical.from_codes(self.obs[field].astype(np.int64), categories=pd.Index(table))
+
+    def to_frame(self) -> pd.DataFrame:
+        """date_utc / mag / band / station / note2 / desig with categorical labels."""
+        return pd.DataFrame({
+            "date_utc": self.dates(),
+            "mag": self.mag64,
+            **{field: self.categorical(field) for field in ("band", "station", "note2", "desig")},
+        })
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "I3.txt"
+    t0 = time.perf_counter()
+    df = load_observations(path, obj=None)
+    store = ObsStore.from_frame(df)
+    dt = time.perf_counter() - t0
+    legacy = pd.DataFrame({"date_utc": df["date_utc"], "mag": df["mag"],
+                           "filter": df["band"].astype(str), "station": df["station"].astype(str)})
+    print(f"📦 {len(store)} observations packed in {dt*1e3:.0f} ms")
+    print(f"   store: {store.nbytes / 1e6:.1f} MB  |  object-column frame: "
+          f"{legacy.memory_usage(deep=True).sum() / 1e6:.1f} MB")
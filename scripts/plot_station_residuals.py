@@ -9,46 +9,51 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from mpc_parser import NAT, NS_PER_DAY
+from obs_codes import load_obscodes, topocentric
+from obs_store import ObsStore
+
 MPC_FILE = "I3.txt"
 
 # ------------------------------------------------------------
-# 1. Load MPC Photometry
+# 1. Load MPC Photometry (typed observation store)
 # ------------------------------------------------------------
-rows = []
-with open(MPC_FILE) as f:
-    for line in f:
-        if not line.startswith("0003I"):
-            continue
+store = ObsStore.from_mpc_file(MPC_FILE, obj="0003I")
 
-        try:
-            date = pd.to_datetime(line[15:32].strip(), utc=True)
-            mag = float(line[65:70].strip())
-            station = line[77:80].strip()
-        except Exception:
-            continue
+store = store.select(~np.isnan(store.mag) & (store.t != NAT))
 
-        rows.append((date, mag, station))
-
-df = pd.DataFrame(rows, columns=["date", "mag", "station"])
-df.sort_values("date", inplace=True)
+# Sort by station, then UTC day: each station's run is one contiguous slice.
+# Same-day rows keep the order the original (unstable) quicksort of the
+# datetime64 day column gave them, so the published proxies are reproduced.
+store = store.select(np.argsort(store.night.view("datetime64[D]"), kind="quicksort"))
+store = store.select(np.lexsort([store.night, store.station]))
 
 # ------------------------------------------------------------
 # 2. Compute time-normalized proxy per station (SIMPLIFIED VERSION)
 # ------------------------------------------------------------
 
-# Sort by station and date first
-df = df.sort_values(["station", "date"]).reset_index(drop=True)
-
-df["inv_mag"] = 1.0 / df["mag"]
+# The proxy is built per UTC day (same-day repeats give dt = 0 and are dropped)
+day = store.night
+inv_mag = 1.0 / store.mag64
+same_station = np.r_[False, store.station[1:] == store.station[:-1]]
 
-# Calculate time differences in days
-df["time_diff_days"] = df.groupby("station")["date"].diff().dt.total_seconds() / 86400.0
+# Calculate time differences in days (NaN at the first row of every station)
+time_diff_days = np.where(same_station, np.r_[0, np.diff(day)], np.nan)
 
 # Calculate proxy (d(1/m)/dt)
-df["proxy_raw"] = df.groupby("station")["inv_mag"].diff() / df["time_diff_days"]
+with np.errstate(divide="ignore", invalid="ignore"):
+    proxy_raw = np.r_[np.nan, np.diff(inv_mag)] / time_diff_days
 
 # Remove rows with invalid time differences
-df_clean = df[df["time_diff_days"] > 0].copy()
+keep = time_diff_days > 0
+df_clean = pd.DataFrame({
+    "date": pd.to_datetime(day[keep] * NS_PER_DAY, utc=True),
+    "mag": store.mag64[keep],
+    "station": store.stations[store.station[keep]],
+    "inv_mag": inv_mag[keep],
+    "time_diff_days": time_diff_days[keep],
+    "proxy_raw": proxy_raw[keep],
+})
 
 # Baseline for scaling: everything BEFORE the late-Nov / early-Dec window
 baseline_mask = df_clean["date"] < "2025-11-28"
@@ -71,12 +76,10 @@ print(f"Stations in recent data: {df_recent['station'].unique()}")
 # 4. Plot per-station time series
 # ------------------------------------------------------------
 if len(df_recent) > 0:
-    stations = df_recent["station"].unique()
-
     plt.figure(figsize=(12, 7))
 
-    for s in stations:
-        sub = df_recent[df_recent["station"] == s]
+    # One pass over the station groups (first-appearance order, as before)
+    for s, sub in df_recent.groupby("station", sort=False):
         if len(sub) < 2:  # Need at least 2 points for meaningful plot
             continue
         plt.plot(
@@ -205,3 +208,33 @@ if len(pulse_no703) > 0:
     print(f"Maximum daily mean without 703: {pulse_no703.max():.6f}")
 else:
     print("No data without station 703 in pulse window")
+
+# ------------------------------------------------------------
+# 6. Geometry-corrected station offsets (topocentric, offline)
+# ------------------------------------------------------------
+print("\n📐 GEOMETRY-CORRECTED STATION OFFSETS:")
+print("=====================================")
+try:
+    codes = load_obscodes()
+except Exception as e:
+    codes = None
+    print(f"⚠️  MPC observatory codes unavailable ({e}); set OBSCODES_FILE to a local ObsCodes.html.")
+
+if codes is not None:
+    stations = store.stations[store.station]
+    geo = topocentric(store.t.view("datetime64[ns]"), stations, codes)
+    # Reduced magnitude: remove each station's own r·Δ distance term
+    reduced = store.mag64 - 5 * np.log10(geo["r"].to_numpy() * geo["delta"].to_numpy())
+    df_geo = pd.DataFrame({"night": store.night, "station": stations,
+                           "raw": store.mag64, "reduced": reduced, "airmass": geo["airmass"].to_numpy()})
+    # Offset of every observation from the all-station median of its night
+    for col in ("raw", "reduced"):
+        df_geo[col + "_offset"] = df_geo[col] - df_geo.groupby("night")[col].transform("median")
+    per_station = df_geo.groupby("station").agg(
+        n=("reduced", "size"), raw_offset=("raw_offset", "median"),
+        reduced_offset=("reduced_offset", "median"), airmass=("airmass", "median"))
+    per_station = per_station[per_station["n"] >= 5]
+    print(f"Topocentric geometry for {len(df_geo)} observations "
+          f"({(~geo['topo']).sum()} without parallax constants, geocentric)")
+    print(per_station.reindex(per_station["reduced_offset"].abs().sort_values(ascending=False).index)
+          .head(10).round(3).to_string())
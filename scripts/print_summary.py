@@ -5,34 +5,25 @@ Parses I3.txt directly, extracts magnitudes and dates,
 groups by month, and prints statistical summary + sample.
 """
 
-import re
 import pandas as pd
 from datetime import datetime
 
+from mpc_cache import load_observations
+
 def parse_i3_txt(filename="I3.txt"):
-    """Parse MPC-format I3.txt into DataFrame (date, ra, dec, mag)."""
-    pattern = re.compile(
-        r"0003I\s+[A-Za-z0-9]+\s+(\d{4}) (\d{2}) (\d{2})\.(\d+)"
-        r"\s+([0-9\s\.]+)([+-][0-9\s\.]+)\s+([0-9\.]+)"
-    )
-    rows = []
-    with open(filename) as f:
-        for line in f:
-            if line.startswith("0003I"):
-                parts = re.findall(r"(\d{4}) (\d{2}) (\d{2})\.(\d+)", line)
-                if not parts:
-                    continue
-                y, m, d, frac = parts[0]
-                frac_day = float("0." + frac)
-                date = datetime.strptime(f"{y}-{m}-{d}", "%Y-%m-%d") \
-                        .replace(hour=int(frac_day * 24),
-                                 minute=int((frac_day * 24 * 60) % 60))
-                mag_match = re.search(r"\s([0-9]{1,2}\.[0-9])\s+[A-Z]", line)
-                mag = float(mag_match.group(1)) if mag_match else None
-                if mag and 5.0 < mag < 25.0:
-                   rows.append((date, mag))
+    """
+    Parse MPC-format I3.txt into DataFrame (date, mag).
 
-    return pd.DataFrame(rows, columns=["date", "mag"])
+    Keeps the original selection: magnitudes given to 0.1 mag with an
+    upper-case band, 5 < mag < 25.  Taken from the magnitude column rather
+    than by a free regex, so ~1% of lines where a Dec/RA field looked like
+    a magnitude no longer enter the monthly means.
+    """
+    obs = load_observations(filename, obj="0003I")
+    obs = obs[(obs["mag_decimals"] == 1) & obs["band"].astype(str).str.isupper()
+              & (obs["mag"] > 5.0) & (obs["mag"] < 25.0)]
+    return pd.DataFrame({"date": obs["date_utc"].dt.tz_localize(None).dt.floor("min"),
+                         "mag": obs["mag"]}).reset_index(drop=True)
 
 def summarize(df):
     df["month"] = df["date"].dt.to_period("M")
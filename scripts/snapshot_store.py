@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+snapshot_store.py
+Observation-level deduplication across I3.txt snapshots.
+
+data/I3.txt, data/v2_6/I3.txt, ... are overlapping copies of one growing
+file.  Instead of keeping (and parsing) every copy, each 80-column record is
+hashed on ingest and only records never seen before are appended to a shared
+store; a snapshot is kept as the sequence of record ids it consisted of,
+run-length encoded as [start, stop) ranges (a snapshot that only grew is a
+handful of ranges):
+
+    I3_Snapshots.store/
+        index.json       n_records + one entry per snapshot:
+                         name, source, sha256, records, novel, exact, newline, ranges
+        records.u1       unique records, 80 bytes each, append-only
+        hashes.u8        64-bit hash of every stored record
+
+Membership tests are a binary search in the sorted hash set, confirmed by a
+byte comparison, so a hash collision can never merge two different records.
+rebuild() returns any snapshot's original bytes (checked against the
+ingested, decompressed bytes: 'exact'); load() parses the union of any set of snapshots once,
+through the shared parse cache, so "all snapshots" analyses never double
+count or double parse an observation.
+
+Usage:
+    python snapshot_store.py ingest data/I3.txt data/v2_6/I3.txt
+    python snapshot_store.py list
+    python snapshot_store.py rebuild v2_6 I3_v2_6.txt
+
+    from snapshot_store import SnapshotStore
+    snaps = SnapshotStore()
+    obs = snaps.load()                       # every distinct observation, parsed once
+    old = snaps.rebuild("v2_6")              # bytes of that I3.txt version
+
+Author: Salah-Eddin Gherbi
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mpc_cache import _read_json, _write_json, cached_parse, file_sha256
+from mpc_parser import DEFAULT_OBJECT, RECORD_LEN, compression_of, read_mpc_bytes, records_from_bytes
+
+SNAPSHOT_STORE = Path("I3_Snapshots.store")
+INDEX = "index.json"
+STORE_VERSION = 1
+
+_WORDS = RECORD_LEN // 8
+_MULT = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+def record_hashes(rec: np.ndarray) -> np.ndarray:
+    """64-bit hash of every 80-byte record row (vectorized, no Python loop over rows)."""
+    words = np.ascontiguousarray(rec).view("<u8").reshape(-1, _WORDS)
+    h = np.full(len(words), RECORD_LEN, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(_WORDS):
+            h = (h ^ words[:, j]) * _MULT
+        # splitmix64 finaliser: spread every input bit over the whole word
+        h ^= h >> np.uint64(30)
+        h *= _MIX1
+        h ^= h >> np.uint64(27)
+        h *= _MIX2
+        h ^= h >> np.uint64(31)
+    return h
+
+def to_ranges(ids: np.ndarray) -> list:
+    """Run-length encode an id sequence as [start, stop) ranges of consecutive ids."""
+    if len(ids) == 0:
+        return []
+    cut = np.flatnonzero(np.diff(ids) != 1) + 1
+    starts = ids[np.r_[0, cut]]
+    lengths = np.diff(np.r_[0, cut, len(ids)])
+    return [[int(s), int(s + n)] for s, n in zip(starts, lengths)]
+
+def from_ranges(ranges) -> np.ndarray:
+    if not ranges:
+        return np.empty(0, dtype=np.int64)
+    r = np.asarray(ranges, dtype=np.int64)
+    lengths = r[:, 1] - r[:, 0]
+    return np.repeat(r[:, 0] - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+
+class SnapshotStore:
+    """Unique-record store + per-snapshot id ranges under one directory."""
+
+    def __init__(self, path=SNAPSHOT_STORE):
+        self.path = Path(path)
+        self.index = _read_json(self.path / INDEX) or {
+            "version": STORE_VERSION, "n_records": 0, "snapshots": []}
+        if self.index.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.path} is snapshot-store version {self.index.get('version')}, "
+                             f"expected {STORE_VERSION}")
+        n = self.n_records
+        self._hashes = self._read("hashes.u8", "<u8", n)
+        self._order = np.argsort(self._hashes, kind="stable")
+        self._sorted = self._hashes[self._order]
+
+    # ---------------- files ----------------
+    @property
+    def n_records(self) -> int:
+        return self.index["n_records"]
+
+    def _read(self, name, dtype, count):
+        f = self.path / name
+        if count == 0 or not f.is_file():
+            return np.empty(0, dtype=dtype)
+        return np.fromfile(f, dtype=dtype, count=count)
+
+    def records(self, ids=None) -> np.ndarray:
+        """(n, 80) uint8 rows of the stored records (memory-mapped, gathered by id)."""
+        if self.n_records == 0:
+            return np.empty((0, RECORD_LEN), dtype=np.uint8)
+        rec = np.memmap(self.path / "records.u1", dtype=np.uint8, mode="r",
+                        shape=(self.n_records, RECORD_LEN))
+        return np.asarray(rec if ids is None else rec[ids])
+
+    def _append(self, name, a: np.ndarray, row_bytes: int):
+        """Append rows after the committed ones (dropping rows of an interrupted ingest)."""
+        with open(self.path / name, "ab") as f:
+            f.truncate(self.n_records * row_bytes)
+            f.write(a.tobytes())
+
+    # ---------------- lookup ----------------
+    def lookup(self, rec: np.ndarray, hashes=None) -> np.ndarray:
+        """Stored id of every record row, -1 where the record is not in the store."""
+        hashes = record_hashes(rec) if hashes is None else hashes
+        ids = np.full(len(rec), -1, dtype=np.int64)
+        if len(self._sorted) == 0 or len(rec) == 0:
+            return ids
+        pos = np.minimum(np.searchsorted(self._sorted, hashes), len(self._sorted) - 1)
+        hit = np.flatnonzero(self._sorted[pos] == hashes)
+        cand = self._order[pos[hit]]
+        same = (self.records(cand) == rec[hit]).all(axis=1)
+        if not same.all():
+            raise ValueError(f"64-bit record hash collision in {self.path}")
+        ids[hit] = cand
+        return ids
+
+    # ---------------- ingest ----------------
+    def snapshot(self, name) -> dict:
+        for s in self.index["snapshots"]:
+            if s["name"] == name:
+                return s
+        raise KeyError(f"No snapshot {name!r} in {self.path}")
+
+    def ingest(self, path, name=None) -> dict:
+        """Add a snapshot file; only records not already stored are written."""
+        path = Path(path)
+        digest = file_sha256(path)
+        for s in self.index["snapshots"]:
+            if s["sha256"] == digest:
+                return s                                  # same bytes already ingested
+        stem = Path(path.stem).stem if compression_of(path) else path.stem     # I3.txt.gz → I3
+        name = name or (path.parent.name if path.parent.name not in ("", ".", "data") else stem)
+        if any(s["name"] == name for s in self.index["snapshots"]):
+            name = f"{name}_{digest[:8]}"
+
+        buf = read_mpc_bytes(path)                       # archives are decompressed
+        rec = np.ascontiguousarray(records_from_bytes(buf))
+        hashes = record_hashes(rec)
+
+        # Distinct records of this file, then which of them the store lacks
+        uniq_h, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        if not (rec[first[inverse]] == rec).all():
+            raise ValueError(f"64-bit record hash collision in {path}")
+        stored = self.lookup(rec[first], uniq_h)
+        novel = np.flatnonzero(stored < 0)
+        novel = novel[np.argsort(first[novel], kind="stable")]     # keep file order
+        stored[novel] = self.n_records + np.arange(len(novel))
+        ids = stored[inverse]
+
+        if len(novel):
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._append("records.u1", rec[first[novel]], RECORD_LEN)
+            self._append("hashes.u8", uniq_h[novel], 8)
+            self._hashes = np.r_[self._hashes, uniq_h[novel]]
+            self._order = np.argsort(self._hashes, kind="stable")
+            self._sorted = self._hashes[self._order]
+            self.index["n_records"] += len(novel)
+
+        crlf = b"\r\n" in buf[:4 * (RECORD_LEN + 2)]
+        entry = {
+            "name": name,
+            "source": str(path),
+            "sha256": digest,
+            "records": int(len(ids)),
+            "novel": int(len(novel)),
+            "newline": "\r\n" if crlf else "\n",
+            "final_newline": buf.endswith(b"\n"),
+            "ranges": to_ranges(ids),
+        }
+        self.index["snapshots"].append(entry)
+        entry["exact"] = self.rebuild(name) == buf
+        _write_json(self.path / INDEX, self.index)
+        return entry
+
+    # ---------------- read back ----------------
+    def snapshots(self) -> pd.DataFrame:
+        cols = ["name", "source", "records", "novel", "exact", "sha256"]
+        return pd.DataFrame([{**s, "ranges": len(s["ranges"])} for s in self.index["snapshots"]],
+                            columns=cols + ["ranges"])
+
+    def ids(self, name) -> np.ndarray:
+        return from_ranges(self.snapshot(name)["ranges"])
+
+    def rebuild(self, name) -> bytes:
+        """The snapshot's bytes (80-column records, its newline convention)."""
+        s = self.snapshot(name)
+        rec = self.records(self.ids(name))
+        nl = np.frombuffer(s["newline"].encode(), dtype=np.uint8)
+        lines = np.hstack([rec, np.broadcast_to(nl, (len(rec), len(nl)))]).tobytes()
+        return lines if s["final_newline"] or not lines else lines[:-len(nl)]
+
+    def union_ids(self, names=None) -> np.ndarray:
+        """Sorted distinct record ids of the given snapshots (default: all)."""
+        names = [s["name"] for s in self.index["snapshots"]] if names is None else names
+        return np.unique(np.concatenate([self.ids(n) for n in names] or [np.empty(0, np.int64)]))
+
+    def load(self, names=None, obj=DEFAULT_OBJECT, notes=None) -> pd.DataFrame:
+        """Parsed observations of the union of snapshots, each distinct record once."""
+        rec = self.records(self.union_ids(names))
+        buf = np.hstack([rec, np.full((len(rec), 1), ord("\n"), dtype=np.uint8)]).tobytes()
+        return cached_parse(buf, obj=obj, notes=notes)
+
+    def nbytes(self) -> int:
+        return sum(p.stat().st_size for p in self.path.iterdir() if p.is_file()) if self.path.is_dir() else 0
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Deduplicated store of I3.txt snapshots.")
+    p.add_argument("command", choices=["ingest", "list", "rebuild"])
+    p.add_argument("args", nargs="*", help="files (ingest) or NAME OUT (rebuild)")
+    p.add_argument("--store", default=str(SNAPSHOT_STORE))
+    args = p.parse_args()
+
+    snaps = SnapshotStore(args.store)
+    if args.command == "ingest":
+        raw = 0
+        for path in args.args:
+            known = len(snaps.index["snapshots"])
+            s = snaps.ingest(path)
+            raw += Path(path).stat().st_size
+            if len(snaps.index["snapshots"]) == known:
+                print(f"⏭️  {path}: already stored as {s['name']}")
+                continue
+            print(f"📥 {path} → {s['name']}: {s['records']} records, {s['novel']} new, "
+                  f"{len(s['ranges'])} ranges{'' if s['exact'] else ' (normalized to 80 columns)'}")
+        print(f"💾 {raw / 1e3:.1f} kB of snapshots → {snaps.nbytes() / 1e3:.1f} kB "
+              f"({snaps.n_records} distinct records) in {snaps.path}")
+    elif args.command == "list":
+        print(snaps.snapshots().drop(columns=["sha256"]).to_string(index=False))
+    else:
+        name, out = args.args
+        Path(out).write_bytes(snaps.rebuild(name))
+        print(f"📝 Rebuilt {name} → {out}")
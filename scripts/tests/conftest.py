@@ -0,0 +1,6 @@
+"""Shared test setup: the scripts are plain modules, imported from the parent directory."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
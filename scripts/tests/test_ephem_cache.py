@@ -0,0 +1,74 @@
+"""ephem_cache against a local stand-in for Horizons."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ephem_cache
+
+STEPS = {"1d": "1440min", "3h": "180min", "1h": "60min", "30m": "30min"}
+
+def truth(jd):
+    d = jd - 2460977.5
+    return {"r": 1.36 + 0.0005 * d * d / np.sqrt(1 + 0.01 * d * d), "delta": 2.0 + 0.3 * np.sin(d / 20),
+            "alpha": 10 + 5 * np.cos(d / 15), "RA": np.mod(350 + 0.8 * d, 360), "DEC": -5 + 0.2 * d}
+
+class StandIn:
+    """Horizons stand-in: exact start..stop grid at `step`, smooth known quantities."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, target, location, start, stop, step):
+        self.calls.append((target, location, start, stop, step))
+        t = pd.date_range(start, stop, freq=STEPS[step])
+        jd = t.to_julian_date().to_numpy()
+        return pd.DataFrame({"datetime_str": t.strftime("%Y-%b-%d %H:%M"), "datetime_jd": jd, **truth(jd)})
+
+@pytest.fixture
+def horizons():
+    return StandIn()
+
+def test_second_request_is_a_cache_hit(horizons, tmp_path):
+    a = ephem_cache.ephemeris("3I", "@399", "2025-11-01", "2025-11-10", "1h", query=horizons, cache_dir=tmp_path)
+    b = ephem_cache.ephemeris("3I", "@399", "2025-11-01", "2025-11-10", "1h", query=horizons, cache_dir=tmp_path)
+    assert len(horizons.calls) == 1
+    pd.testing.assert_frame_equal(a.table, b.table)
+    assert len(b.table) == 9 * 24 + 1
+
+def test_covering_entry_is_reused_and_trimmed(horizons, tmp_path):
+    ephem_cache.ephemeris("3I", "@399", "2025-07-01", "2025-12-31", "30m", query=horizons, cache_dir=tmp_path)
+    eph = ephem_cache.ephemeris("3I", "@399", "2025-11-01", "2025-11-03", "30m", query=horizons, cache_dir=tmp_path)
+    assert len(horizons.calls) == 1                     # inside the cached span: no query
+    t = pd.to_datetime(eph.table["datetime_jd"], unit="D", origin="julian")
+    assert t.iloc[0] == pd.Timestamp("2025-11-01") and t.iloc[-1] == pd.Timestamp("2025-11-03")
+    assert len(eph.table) == 2 * 48 + 1
+
+def test_merged_span_is_trimmed_to_the_request(horizons, tmp_path):
+    ephem_cache.ephemeris("3I", "@399", "2025-11-01", "2025-11-10", "1h", query=horizons, cache_dir=tmp_path)
+    eph = ephem_cache.ephemeris("3I", "@399", "2025-11-08", "2025-11-20", "1h", query=horizons, cache_dir=tmp_path)
+    assert horizons.calls[-1][2] == "2025-11-10 01:00"  # only the uncovered part is fetched
+    assert eph.jd[0] == pytest.approx(pd.Timestamp("2025-11-08").to_julian_date())
+    assert eph.jd[-1] == pytest.approx(pd.Timestamp("2025-11-20").to_julian_date())
+
+def test_interpolation_error(horizons, tmp_path):
+    eph = ephem_cache.ephemeris("3I", "@399", "2025-10-20", "2025-12-20", "1h", query=horizons, cache_dir=tmp_path)
+    jd = np.random.default_rng(1).uniform(eph.jd[0], eph.jd[-1], 20_000)
+    geo = eph.at(jd, ["r", "delta", "alpha", "RA", "DEC"])
+    want = truth(jd)
+    for q in ("r", "delta", "alpha", "DEC"):
+        assert np.max(np.abs(geo[q] - want[q])) < 1e-6
+    dra = (geo["RA"] - want["RA"] + 180) % 360 - 180    # RA crosses 0/360 inside the span
+    assert np.max(np.abs(dra)) < 1e-9 and geo["RA"].between(0, 360).all()
+    assert np.isnan(eph("r", [eph.jd[0] - 1, eph.jd[-1] + 1])).all()
+
+def test_prefetch_inside_a_running_event_loop(horizons, tmp_path):
+    async def notebook_cell():
+        return ephem_cache.prefetch([("3I", loc, "2025-11-01", "2025-11-02", "1h") for loc in ("I41", "T08")],
+                                    query=horizons, cache_dir=tmp_path)
+
+    filled = asyncio.run(notebook_cell())
+    assert sorted(entry["location"] for entry, _ in filled) == ["I41", "T08"]
+    assert len(horizons.calls) == 2
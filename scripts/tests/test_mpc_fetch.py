@@ -0,0 +1,116 @@
+"""mpc_fetch against a local stand-in server with ETag and Range support."""
+
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import mpc_fetch
+
+LINE = b"0003I         C2025 07 01.12345 12 34 56.78 -01 23 45.6          17.83rU     W68\n"
+
+class Resource:
+    """What the stand-in server serves, and what it was asked for."""
+
+    def __init__(self, body=b""):
+        self.body = body
+        self.ranges = True
+        self.requests = []          # (range header, status sent)
+
+    @property
+    def etag(self):
+        return '"%s"' % hashlib.sha256(self.body).hexdigest()[:16]
+
+def make_handler(res):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            rng = self.headers.get("Range")
+            if self.headers.get("If-None-Match") == res.etag:
+                return self._send(304, rng)
+            if rng and res.ranges:
+                start = int(rng.split("=")[1].rstrip("-"))
+                if start >= len(res.body):
+                    return self._send(416, rng, headers={"Content-Range": f"bytes */{len(res.body)}"})
+                part = res.body[start:]
+                return self._send(206, rng, part, {
+                    "Content-Range": f"bytes {start}-{len(res.body) - 1}/{len(res.body)}"})
+            self._send(200, rng, res.body)
+
+        def _send(self, status, rng, body=b"", headers=None):
+            res.requests.append((rng, status))
+            self.send_response(status)
+            if status != 304:
+                self.send_header("ETag", res.etag)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(mpc_fetch, "_SESSION", None)
+    res = Resource(LINE * 200)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(res))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield res, f"http://127.0.0.1:{httpd.server_port}/I3.txt"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_first_fetch_is_full(server, tmp_path):
+    res, url = server
+    buf, status = mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    assert (buf, status) == (res.body, "full")
+    assert res.requests == [(None, 200)]
+
+def test_unchanged_is_304(server, tmp_path):
+    res, url = server
+    mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    buf, status = mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    assert (buf, status) == (res.body, "unchanged")
+    assert res.requests[-1][1] == 304
+
+def test_growth_appends_tail_only(server, tmp_path):
+    res, url = server
+    mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    have = len(res.body)
+    res.body += LINE * 10
+    buf, status = mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    assert (buf, status) == (res.body, "appended")
+    assert res.requests[-1] == (f"bytes={have - mpc_fetch.OVERLAP}-", 206)
+    data_path, _ = mpc_fetch.mirror_paths(url, tmp_path)
+    assert data_path.read_bytes() == res.body
+
+def test_rewritten_prefix_refetches_in_full(server, tmp_path):
+    res, url = server
+    mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    res.body = res.body.replace(b"17.83", b"17.84") + LINE
+    buf, status = mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    assert (buf, status) == (res.body, "full")
+    assert [s for _, s in res.requests[-2:]] == [206, 200]
+
+def test_shrunk_file_416_refetches_in_full(server, tmp_path):
+    res, url = server
+    mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    res.body = LINE * 20                              # shorter than the range start
+    buf, status = mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    assert (buf, status) == (res.body, "full")
+    assert [s for _, s in res.requests[-2:]] == [416, 200]
+
+def test_server_without_range_falls_back_to_200(server, tmp_path):
+    res, url = server
+    mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    res.ranges = False
+    res.body += LINE * 3
+    buf, status = mpc_fetch.fetch_url(url, cache_dir=tmp_path)
+    assert (buf, status) == (res.body, "full")
+    assert res.requests[-1][1] == 200
+    data_path, _ = mpc_fetch.mirror_paths(url, tmp_path)
+    assert data_path.read_bytes() == res.body
@@ -81,6 +81,7 @@ echo "🧹 Cleaned duplicate lines → I3.txt refreshed"
 # 4️⃣ VERIFY FILE HEALTH
 LINES=$(grep -c "^0003I" I3.txt || true)
 echo "✅ $LINES total MPC records found in I3.txt"
+python3 debug_magnitude_parsing.py I3.txt || echo "⚠️ Parse audit failed — continuing"
 
 # 5️⃣ RUN THE MAIN PIPELINE
 echo "⚙️  Running analysis pipeline..."
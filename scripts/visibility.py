@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+visibility.py
+Offline visibility windows and forced-photometry epochs for 3I/ATLAS.
+
+Replaces the Horizons round trip of find_ztf_windows_and_mjds.py /
+make_ephem_forcedphot.py with a local computation on a 1-minute grid:
+
+  • target RA/Dec, elongation, r, delta from the two-body model (two_body.py),
+    once for the whole grid (topocentric parallax is a few arcsec: irrelevant
+    for altitude);
+  • Sun RA/Dec from the same low-precision Earth ephemeris;
+  • per station (MPC observatory codes, obs_codes.py) the local sidereal
+    time, Sun altitude, target altitude and airmass as one (stations × grid)
+    array.
+
+A minute is usable when the Sun is below SUN_ALT_MAX, the target above
+EL_MIN, its airmass below AIRMASS_MAX and its elongation above ELONG_MIN.
+Usable minutes are grouped into local nights (noon to noon at the station's
+longitude) and SPACING_MIN-minute slots; the best-airmass minute of each
+slot is a candidate (of two candidates closer than SPACING_MIN the worse is
+dropped) and the N_PER_NIGHT best candidates of every night are kept (sorts
+and group boundaries, no Python loop over nights).  The picked
+epochs get topocentric RA/Dec and are printed as the ZTF queue block
+(mjd ra dec).  A two-month season for a dozen sites takes well under a second.
+
+Usage:
+    python visibility.py                                   # I41, 2025-11-01 → 2025-12-31
+    python visibility.py --stations I41,T05,W68 --start 2025-11-01 --stop 2026-01-31 --per-night 3
+
+    from visibility import plan
+    picks = plan(["I41"], "2025-11-01", "2025-12-31")    # station, night, mjd, ra, dec, alt, airmass, ...
+
+Author: Salah-Eddin Gherbi
+"""
+
+import numpy as np
+import pandas as pd
+
+from ephem_cache import to_jd
+from obs_codes import airmass, altitude, gmst_deg, load_obscodes, topocentric
+from two_body import earth_heliocentric, ecliptic_to_equatorial, geometry
+
+STEP_MIN = 1
+SUN_ALT_MAX = -18.0          # astronomical night
+EL_MIN = 20.0
+ELONG_MIN = 25.0
+AIRMASS_MAX = 2.5
+N_PER_NIGHT = 5
+SPACING_MIN = 30             # picked epochs of one night are at least one slot apart
+OUT_CSV = "ZTF_visibility_epochs.csv"     # not find_ztf_windows_and_mjds.py's CSV: other columns
+
+def sun_radec(jd):
+    """Geocentric RA/Dec (deg) of the Sun (low-precision, J2000)."""
+    x, y, z = ecliptic_to_equatorial(-earth_heliocentric(jd)).T
+    return np.mod(np.degrees(np.arctan2(y, x)), 360), np.degrees(np.arctan2(z, np.hypot(x, y)))
+
+def _first_of_groups(*keys):
+    """Mask of the first row of every run of equal keys (rows already sorted by keys)."""
+    first = np.zeros(len(keys[0]), dtype=bool)
+    first[:1] = True
+    for k in keys:
+        first[1:] |= k[1:] != k[:-1]
+    return first
+
+def windows(stations, start, stop, codes=None, step_min=STEP_MIN, spacing_min=SPACING_MIN,
+            sun_alt_max=SUN_ALT_MAX, el_min=EL_MIN, elong_min=ELONG_MIN, airmass_max=AIRMASS_MAX) -> pd.DataFrame:
+    """Every usable grid minute per station (station, night, jd, alt, airmass, sun_alt, elong, ...)."""
+    codes = codes or load_obscodes()
+    stations = list(stations)
+    row = codes.index(stations)
+    missing = [s for s, r in zip(stations, row) if r < 0 or not np.isfinite(codes.rho_cos[r])]
+    if missing:
+        raise KeyError(f"no ground-based parallax constants for {', '.join(missing)}")
+    lon = codes.lon[row]
+    lon = np.where(lon > 180, lon - 360, lon)            # (-180, 180]: west of Greenwich is negative
+    lat = np.arctan2(codes.rho_sin[row], codes.rho_cos[row])
+
+    jd0, jd1 = (float(v) for v in to_jd([pd.Timestamp(start), pd.Timestamp(stop)]))
+    jd = jd0 + np.arange(int(round((jd1 - jd0) * 1440 / step_min)) + 1) * (step_min / 1440)
+    geo = geometry(jd)
+    sun_ra, sun_dec = sun_radec(jd)
+
+    # (stations × grid) in one broadcast
+    lst = np.radians(gmst_deg(jd)[None, :] + lon[:, None])
+    sun_alt = altitude(sun_ra[None, :], sun_dec[None, :], lst, lat[:, None])
+    alt = altitude(geo["RA"].to_numpy()[None, :], geo["DEC"].to_numpy()[None, :], lst, lat[:, None])
+    am = airmass(alt)
+    elong = geo["elong"].to_numpy()
+    with np.errstate(invalid="ignore"):
+        ok = (sun_alt < sun_alt_max) & (alt >= el_min) & (am <= airmass_max) & (elong[None, :] >= elong_min)
+
+    s_idx, g_idx = np.nonzero(ok)
+    t = jd[g_idx]
+    local = t + lon[s_idx] / 360                       # integer steps at local mean noon; label = evening date
+    night = np.floor(local).astype(np.int64)
+    return pd.DataFrame({
+        "station": np.asarray(stations, dtype=object)[s_idx],
+        "night": pd.to_datetime(night, unit="D", origin="julian").normalize(),
+        "jd": t,
+        "mjd": t - 2400000.5,
+        "slot": np.floor((local - night) * 1440 / spacing_min).astype(np.int64),
+        "alt": alt[s_idx, g_idx],
+        "airmass": am[s_idx, g_idx],
+        "sun_alt": sun_alt[s_idx, g_idx],
+        "elong": elong[g_idx],
+        "r": geo["r"].to_numpy()[g_idx],
+        "delta": geo["delta"].to_numpy()[g_idx],
+    })
+
+def plan(stations, start, stop, codes=None, per_night=N_PER_NIGHT, spacing_min=SPACING_MIN, **cuts) -> pd.DataFrame:
+    """The `per_night` lowest-airmass epochs of every station-night, at least `spacing_min` apart."""
+    codes = codes or load_obscodes()
+    vis = windows(stations, start, stop, codes=codes, spacing_min=spacing_min, **cuts)
+    if vis.empty:
+        return vis.drop(columns="slot").assign(ra=[], dec=[])
+
+    st = vis["station"].to_numpy(dtype=str)
+    night = vis["night"].to_numpy()
+    slot = vis["slot"].to_numpy()
+    am = vis["airmass"].to_numpy()
+
+    # Best minute of every (station, night, slot), in time order
+    order = np.lexsort((am, slot, night, st))
+    best = order[_first_of_groups(st[order], night[order], slot[order])]
+    best = best[np.lexsort((vis["jd"].to_numpy()[best], st[best]))]
+    # Neighbouring slots can pick minutes closer than spacing_min: drop the worse of each such pair
+    t = vis["jd"].to_numpy()[best]
+    clash = (np.diff(t) * 1440 < spacing_min) & (st[best][1:] == st[best][:-1])
+    worse_right = am[best][1:] >= am[best][:-1]
+    drop = np.zeros(len(best), dtype=bool)
+    drop[1:] |= clash & worse_right
+    drop[:-1] |= clash & ~worse_right
+    best = best[~drop]
+    # The per_night best slots of every (station, night)
+    best = best[np.lexsort((am[best], night[best], st[best]))]
+    first = _first_of_groups(st[best], night[best])
+    start_of = np.maximum.accumulate(np.where(first, np.arange(len(best)), 0))
+    picks = vis.iloc[best[np.arange(len(best)) - start_of < per_night]].drop(columns="slot")
+    picks = picks.sort_values(["station", "jd"], kind="stable").reset_index(drop=True)
+
+    topo = topocentric(picks["jd"].to_numpy(), picks["station"].to_numpy(dtype=str), codes)
+    picks["ra"] = topo["RA"].to_numpy()
+    picks["dec"] = topo["DEC"].to_numpy()
+    return picks
+
+def queue_block(picks: pd.DataFrame) -> str:
+    """The mjd ra dec lines of the ZTF forced-photometry queue."""
+    return "\n".join(f"{r.mjd:.6f} {r.ra:.5f} {r.dec:.5f}" for r in picks.itertuples())
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    p = argparse.ArgumentParser(description="Offline visibility windows / ZTF forced-photometry epochs.")
+    p.add_argument("--stations", default="I41", help="MPC observatory codes, comma-separated")
+    p.add_argument("--start", default="2025-11-01")
+    p.add_argument("--stop", default="2025-12-31")
+    p.add_argument("--per-night", type=int, default=N_PER_NIGHT)
+    p.add_argument("--spacing", type=int, default=SPACING_MIN, help="minutes between epochs of one night")
+    p.add_argument("--el-min", type=float, default=EL_MIN)
+    p.add_argument("--elong-min", type=float, default=ELONG_MIN)
+    p.add_argument("--airmass-max", type=float, default=AIRMASS_MAX)
+    p.add_argument("--sun-alt-max", type=float, default=SUN_ALT_MAX)
+    p.add_argument("--obscodes", default=None, help="local ObsCodes.html (default: $OBSCODES_FILE or the MPC list)")
+    p.add_argument("--out", default=OUT_CSV)
+    args = p.parse_args()
+
+    codes = load_obscodes(args.obscodes)
+    stations = []
+    for s, r in zip(args.stations.split(","), codes.index(args.stations.split(","))):
+        if r < 0 or not np.isfinite(codes.rho_cos[r]):
+            print(f"⚠️  {s}: unknown or space-based code, skipped")
+        else:
+            stations.append(s)
+    if not stations:
+        raise SystemExit("No ground-based station to plan for.")
+    t0 = time.perf_counter()
+    picks = plan(stations, args.start, args.stop, codes=codes, per_night=args.per_night,
+                 spacing_min=args.spacing, el_min=args.el_min, elong_min=args.elong_min,
+                 airmass_max=args.airmass_max, sun_alt_max=args.sun_alt_max)
+    dt = time.perf_counter() - t0
+    print(f"🌙 {args.start} → {args.stop} @ {', '.join(stations)}: {len(picks)} epochs on "
+          f"{picks.groupby(['station', 'night']).ngroups if len(picks) else 0} station-nights in {dt:.2f} s")
+
+    if picks.empty:
+        print("No viable night-time windows in this range/thresholds.")
+    else:
+        cols = ["station", "mjd", "ra", "dec", "alt", "airmass", "sun_alt", "elong", "r", "delta"]
+        picks[cols].to_csv(args.out, index=False)
+        print(picks[cols].head(30).round(5).to_string(index=False))
+        print(f"\nSaved: {args.out}  (rows: {len(picks)})")
+        for station, sub in picks.groupby("station", sort=False):
+            print(f"\n---- Copy the lines below into the ZTF queue ({station}) ----")
+            print(queue_block(sub))
@@ -4,23 +4,44 @@ watch_mpc_colors.py
 Detect NEW color pairs (g–r, g–o, r–o, etc.) for 3I/ATLAS (C/2019 Y4) from MPC I3.txt.
 
 - Default: reads local I3.txt in the current folder
-- Optional: --url https://... to fetch I3.txt from the web
+- Optional: --url https://... to fetch I3.txt from the web; refreshes are
+  conditional (ETag / If-Modified-Since) and pull only the appended tail via
+  HTTP Range when the server supports it (mpc_fetch.py)
 - Pairs are built for the same night and (optionally) ±N-day tolerance
 - New findings are appended to I3_Color_Alerts.csv and printed to console
-- State is tracked in .mpc_color_state.json so you only see *new* pairs
+- State is tracked in .mpc_color_state.json so you only see *new* pairs: it
+  keeps a sorted fingerprint set (centre night, pair, colour to 1e-4 mag) of
+  every pair reported so far, and each run prints exactly the pairs that were
+  added or whose colour changed since then
+- Incremental: the state records how many bytes were ingested and the SHA-256
+  of that prefix. If the file only grew, just the appended lines are parsed and
+  only the nights they touch (±window) get their pairs recomputed. A rewritten
+  file (prefix hash mismatch, e.g. after sort|uniq) falls back to a full rebuild.
+- --watch: long-running asyncio daemon instead of a cron job. The file is
+  polled by stat (size, mtime, inode), a --url by content digest; parsed state
+  stays in memory and a pass (pairs, alert stats, optional --plot refresh) runs
+  only when new data arrives, so alerts land within one polling interval.
+- obs_set lists the MPC observatory codes (cols 78–80) behind each pair
 
 Usage examples:
   python watch_mpc_colors.py
   python watch_mpc_colors.py --window 1
   python watch_mpc_colors.py --url https://example/I3.txt --window 2
+  python watch_mpc_colors.py --watch --interval 5 --plot I3_Color_Watch.png
 """
 
-import argparse, re, json, sys, hashlib
+import argparse, asyncio, json, signal, sys, hashlib
 from datetime import timedelta
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+from color_pairs import color_pairs
+from mpc_cache import cached_parse, sha256_bytes
+from mpc_fetch import fetch_url
+from mpc_parser import NS_PER_DAY, parse_mpc_bytes, read_mpc_bytes
+
 try:
     import requests
 except ImportError:
@@ -34,68 +55,57 @@ def get_args():
     p.add_argument("--window", type=int, default=1, help="±days tolerance for cross-night pairing (default: 1)")
     p.add_argument("--start", default="2025-07-01", help="Start date (UTC) for filtering (YYYY-MM-DD)")
     p.add_argument("--end",   default="2025-12-31", help="End date (UTC) for filtering (YYYY-MM-DD)")
+    p.add_argument("--watch", action="store_true", help="Keep running and re-check the source every --interval seconds")
+    p.add_argument("--interval", type=float, default=10, help="Polling interval in seconds for --watch (default: 10)")
+    p.add_argument("--plot", default=None, metavar="PNG", help="With --watch: refresh this color plot after new alerts")
     return p.parse_args()
 
 # ------------------------- Helpers -------------------------
 FILTERS = ["g", "r", "o", "c", "v", "B", "V", "R", "I"]  # MPC tags seen in your file; normalize to lower-case later
 
-def fractional_day_to_datetime(year: int, month: int, day_frac: float) -> pd.Timestamp:
-    day_int = int(day_frac)
-    frac = day_frac - day_int
-    base = pd.Timestamp(f"{year}-{month:02d}-{day_int:02d}", tz="UTC")
-    return base + pd.to_timedelta(frac * 24, unit="h")
+STATE_PATH = Path(".mpc_color_state.json")
+PAIR_COLUMNS = ["date_center","pair","color","n_pts","span_days","phase_deg","obs_set"]
+COMBOS = [("g","r"),("g","o"),("r","o"),("g","v"),("r","v")]
+REPORT_LINES = 20  # most recent added/changed pairs printed per run
 
-def load_text(args) -> str:
+def load_bytes(args) -> bytes:
     if args.url:
         if requests is None:
             print("❌ 'requests' not installed; either install it or use --file.", file=sys.stderr)
             sys.exit(1)
-        r = requests.get(args.url, timeout=30)
-        r.raise_for_status()
-        return r.text
+        # Conditional + ranged fetch into a local mirror (see mpc_fetch.py)
+        buf, status = fetch_url(args.url)
+        print(f"🌐 {args.url}: {status} ({len(buf)} bytes)")
+        return buf
     else:
-        return Path(args.file).read_text(encoding="utf-8", errors="ignore")
-
-def parse_mpc_i3(text: str) -> pd.DataFrame:
-    rows = []
-    for line in text.splitlines():
-        # Only 3I lines
-        if not line.startswith("0003I"):
-            continue
-        # Look for C2025 mm dd.ddddd
-        m_date = re.search(r"C(20\d{2})\s(\d{2})\s(\d{2}\.\d+)", line)
-        if not m_date:
-            continue
-        year  = int(m_date.group(1))
-        month = int(m_date.group(2))
-        day   = float(m_date.group(3))
-
-        # Look for magnitude + filter (e.g., "17.83rU" "16.03gV" etc.)
-        m_mag = re.search(r"(\d{2}\.\d{2})([A-Za-z])", line)
-        if not m_mag:
-            continue
-        mag = float(m_mag.group(1))
-        flt = m_mag.group(2)
-
-        # Obs code at line end (e.g., "#0K4gE55" or similar)
-        m_obs = re.search(r"#\S+$", line)
-        obs = m_obs.group(0)[1:] if m_obs else ""
-
-        tstamp = fractional_day_to_datetime(year, month, day)
-
-        rows.append({
-            "date_utc": tstamp,
-            "year": year,
-            "month": month,
-            "day_frac": day,
-            "mag": mag,
-            "filter": flt,
-            "obs": obs
-        })
-
-    df = pd.DataFrame(rows)
+        return read_mpc_bytes(args.file)       # .gz/.bz2/.xz/.zst decompressed in memory
+
+def complete_length(buf: bytes) -> int:
+    """Bytes up to the last complete record (a trailing partial line waits for the next run)."""
+    nl = buf.rfind(b"\n") + 1
+    return len(buf) if len(buf) - nl >= 80 else nl
+
+def parse_mpc_i3(buf: bytes, digest=None) -> pd.DataFrame:
+    return select_photometry(cached_parse(buf, obj="0003I", notes="C", digest=digest))
+
+def select_photometry(df: pd.DataFrame) -> pd.DataFrame:
+    # Only 3I CCD lines ("C" in column 15) with a magnitude given to 0.01 mag
+    df = df[df["mag"].notna() & (df["mag_decimals"] == 2)]
     if df.empty:
-        return df
+        return pd.DataFrame()
+
+    df = pd.DataFrame({
+        "date_utc": df["date_utc"],
+        "year": df["year"].astype(int),
+        "month": df["month"].astype(int),
+        "day_frac": df["day"],
+        "mag": df["mag"],
+        "filter": df["band"].astype(str),
+        # MPC observatory code (cols 78–80). The old regex took the trailing
+        # "#..." token instead, so obs_set of pairs written before the parser
+        # switch lists those tokens, later ones list station codes.
+        "obs": df["station"].astype(str),
+    })
 
     # Normalize filter tags
     df["filter"] = df["filter"].str.strip()
@@ -107,126 +117,358 @@ def parse_mpc_i3(text: str) -> pd.DataFrame:
     df = df[df["filter_norm"].isin([f.lower() for f in FILTERS])]
     return df
 
-def build_color_pairs(df: pd.DataFrame, window_days: int) -> pd.DataFrame:
+def nightly_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Per (night, filter) magnitude sum, count and station set — the state pairs are rebuilt from."""
     if df.empty:
-        return pd.DataFrame(columns=["date_center","pair","color","n_pts","span_days","phase_deg","obs_set"])
-
-    # phase angle is rarely present; set NaN (you can join Horizons later if desired)
-    df = df.sort_values("date_utc").copy()
-
-    pairs = []
-    tol = pd.Timedelta(days=window_days)
-
-    # compress nightly by filter (mean per night)
-    df["night"] = df["date_utc"].dt.floor("D")
-    nightly = (
+        return pd.DataFrame(columns=["night","filter_norm","mag_sum","n","obs_set"])
+    df = df.assign(night=df["date_utc"].dt.floor("D"))
+    return (
         df.groupby(["night", "filter_norm"], as_index=False)
-          .agg(mag=("mag","mean"), n=("mag","count"), obs_set=("obs", lambda x: ",".join(sorted(set(x)))))
+          .agg(mag_sum=("mag","sum"), n=("mag","count"), obs_set=("obs", lambda x: ",".join(sorted(set(x)))))
     )
 
-    nights = nightly["night"].unique()
-    for center in nights:
-        sub = nightly[ (nightly["night"] >= center - tol) & (nightly["night"] <= center + tol) ]
-        have = dict(sub.groupby("filter_norm")["mag"].mean())
-
-        # candidate pairs we care about
-        combos = [("g","r"),("g","o"),("r","o"),("g","v"),("r","v")]
-        for f1,f2 in combos:
-            if f1 in have and f2 in have:
-                cval = have[f1] - have[f2]  # color index (mag)
-                # points used & span
-                involved = sub[sub["filter_norm"].isin([f1,f2])]
-                n_pts = int(involved["n"].sum())
-                span_days = (involved["night"].max() - involved["night"].min()).days
-                obs_join = ",".join(sorted(set(",".join(involved["obs_set"]).split(","))))
-                pairs.append({
-                    "date_center": center,
-                    "pair": f"{f1}-{f2}",
-                    "color": float(cval),
-                    "n_pts": n_pts,
-                    "span_days": span_days,
-                    "phase_deg": pd.NA,  # placeholder
-                    "obs_set": obs_join
-                })
-
-    out = pd.DataFrame(pairs).sort_values(["date_center","pair"])
-    return out
-
-def digest_rows(df: pd.DataFrame) -> str:
-    # small fingerprint so we can detect new discoveries
-    h = hashlib.sha256()
-    for _, r in df.iterrows():
-        h.update(f"{r['date_center']:%Y-%m-%d}|{r['pair']}|{r['color']:.4f}".encode())
-    return h.hexdigest()
-
-# ------------------------- Main -------------------------
-def main():
-    args = get_args()
+def merge_nightly(nightly: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Fold the nightly table of freshly ingested lines into the stored one."""
+    if nightly.empty:
+        return new
+    both = pd.concat([nightly, new], ignore_index=True)
+    return (
+        both.groupby(["night", "filter_norm"], as_index=False)
+            .agg(mag_sum=("mag_sum","sum"), n=("n","sum"),
+                 obs_set=("obs_set", lambda x: ",".join(sorted(set(",".join(x).split(","))))))
+    )
 
-    # Load MPC
-    try:
-        text = load_text(args)
-    except Exception as e:
-        print(f"❌ Unable to load MPC text: {e}")
-        sys.exit(1)
+def affected_centers(nightly: pd.DataFrame, touched, window_days: int):
+    """Nights whose ±window neighbourhood contains a touched night."""
+    nights = np.sort(nightly["night"].unique())
+    touched = np.sort(pd.DatetimeIndex(touched).unique())
+    tol = pd.Timedelta(days=window_days)
+    lo = np.searchsorted(touched, nights - tol, side="left")
+    hi = np.searchsorted(touched, nights + tol, side="right")
+    return nights[hi > lo]
+
+def night_numbers(nights) -> np.ndarray:
+    """UTC nights (Timestamps) → integer day numbers since 1970-01-01."""
+    idx = pd.DatetimeIndex(nights)
+    if idx.tz is not None:
+        idx = idx.tz_convert("UTC").tz_localize(None)
+    return idx.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+def pairs_for_centers(nightly: pd.DataFrame, centers, window_days: int) -> pd.DataFrame:
+    """Pairs centred on `centers`, from the nightly table (sort-merge engine, see color_pairs.py)."""
+    if nightly.empty or len(centers) == 0:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    pairs = color_pairs(night_numbers(nightly["night"]), nightly["filter_norm"],
+                        nightly["mag_sum"], nightly["n"], night_numbers(centers),
+                        window_days, COMBOS, obs_set=nightly["obs_set"])
+    if pairs.empty:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    pairs["date_center"] = pd.to_datetime(pairs["center"] * NS_PER_DAY, utc=True)
+    pairs["phase_deg"] = pd.NA  # placeholder
+    return pairs[PAIR_COLUMNS].sort_values(["date_center","pair"])
 
-    df = parse_mpc_i3(text)
-    if df.empty:
-        print("⚠️ No usable MPC photometry parsed for 3I/ATLAS.")
-        sys.exit(0)
+def build_color_pairs(df: pd.DataFrame, window_days: int) -> pd.DataFrame:
+    # phase angle is rarely present; set NaN (you can join Horizons later if desired)
+    nightly = nightly_table(df)
+    if nightly.empty:
+        return pd.DataFrame(columns=PAIR_COLUMNS)
+    return pairs_for_centers(nightly, nightly["night"].unique(), window_days)
+
+# ------------------------- Fingerprints -------------------------
+# One int64 key per pair row, (centre day number) * 256 + (pair code), plus the
+# colour rounded to 1e-4 mag as an integer.  The state keeps them as a sorted
+# set, so "what is new" is a binary-search diff instead of a whole-table hash.
+FP_PAIRS = sorted(f"{a}-{b}" for a, b in COMBOS)
+FP_COLOR_SCALE = 10_000
+
+def fingerprints(pairs: pd.DataFrame):
+    """(keys, colours) of every pair row, in row order."""
+    if pairs.empty:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    keys = night_numbers(pairs["date_center"]) * 256 + np.searchsorted(FP_PAIRS, pairs["pair"].to_numpy(str))
+    colors = np.rint(pairs["color"].to_numpy(np.float64) * FP_COLOR_SCALE).astype(np.int64)
+    return keys, colors
+
+def diff_fingerprints(old, keys, colors):
+    """(added, changed, previous colour) of the new rows relative to the sorted set `old`."""
+    old_keys, old_colors = old
+    if len(old_keys) == 0:
+        return np.ones(len(keys), bool), np.zeros(len(keys), bool), np.zeros(len(keys), np.int64)
+    pos = np.minimum(np.searchsorted(old_keys, keys), len(old_keys) - 1)
+    found = old_keys[pos] == keys
+    was = old_colors[pos]
+    return ~found, found & (was != colors), was
+
+def update_fingerprints(old, keys, colors, centers=None):
+    """New sorted set: `old` with the recomputed centres (all if None) replaced by keys/colours."""
+    old_keys, old_colors = old
+    keep = np.zeros(len(old_keys), bool) if centers is None else ~np.isin(old_keys // 256, centers)
+    keys = np.r_[old_keys[keep], keys]
+    colors = np.r_[old_colors[keep], colors]
+    order = np.argsort(keys, kind="stable")
+    return keys[order], colors[order]
+
+def fingerprints_to_json(fp) -> dict:
+    keys, colors = fp
+    return {"pairs": FP_PAIRS, "key_deltas": np.diff(keys, prepend=0).tolist(), "colors": colors.tolist()}
+
+def fingerprints_from_json(blob) -> tuple:
+    """Stored set, or an empty one if missing or written for another pair list."""
+    if not blob or blob.get("pairs") != FP_PAIRS:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return (np.cumsum(np.asarray(blob["key_deltas"], dtype=np.int64)),
+            np.asarray(blob["colors"], dtype=np.int64))
+
+# ------------------------- State -------------------------
+def nightly_to_json(nightly: pd.DataFrame) -> list:
+    return [[f"{r.night:%Y-%m-%d}", r.filter_norm, float(r.mag_sum), int(r.n), r.obs_set]
+            for r in nightly.itertuples(index=False)]
+
+def nightly_from_json(rows: list) -> pd.DataFrame:
+    nightly = pd.DataFrame(rows, columns=["night","filter_norm","mag_sum","n","obs_set"])
+    nightly["night"] = pd.to_datetime(nightly["night"]).dt.tz_localize("UTC")
+    return nightly
+
+def resume_offset(state: dict, buf: bytes, source: str, args):
+    """
+    (offset, running sha256) of the prefix already ingested, if it is still
+    intact and the run parameters are unchanged; otherwise (None, None) → full rebuild.
+    The hash object is returned so the new prefix digest only has to hash the tail.
+    """
+    ing = state.get("ingest")
+    if not ing or ing.get("source") != source:
+        return None, None
+    if [ing.get("window"), ing.get("start"), ing.get("end")] != [args.window, args.start, args.end]:
+        return None, None
+    offset = ing.get("offset", -1)
+    if not 0 <= offset <= len(buf):
+        return None, None
+    h = hashlib.sha256(memoryview(buf)[:offset])
+    if h.hexdigest() != ing.get("prefix_sha256"):
+        return None, None
+    return offset, h
+
+def new_rows(pairs: pd.DataFrame, out_csv: Path) -> pd.DataFrame:
+    """Pairs not already in the alerts CSV (same key as its de-dup)."""
+    if not out_csv.exists() or pairs.empty:
+        return pairs
+    prev = pd.read_csv(out_csv, parse_dates=["date_center"])
+    key = ["date_center","pair","color"]
+    seen = pairs[key].merge(prev[key].drop_duplicates(), how="left", indicator=True)["_merge"].eq("both")
+    return pairs[~seen.to_numpy()]
+
+# ------------------------- One pass -------------------------
+def load_state() -> dict:
+    return json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+
+def run_pass(buf: bytes, state: dict, source: str, args, memo=None) -> pd.DataFrame:
+    """
+    Ingest `buf` (the whole source) against `state`: update the pairs, append
+    new rows to the alerts CSV, save the state and print the added / changed
+    pairs, which are returned (empty frame when there is nothing new).
+    `memo` keeps the decoded nightly table and fingerprint set between passes
+    of the watch daemon, so they are not re-read from the JSON state.
+    """
+    nothing = pd.DataFrame(columns=PAIR_COLUMNS)
+    end_ofs = complete_length(buf)
+    memo = {} if memo is None else memo
+    warm = "nightly" in memo and memo.get("prefix_sha256") == state.get("ingest", {}).get("prefix_sha256")
 
     # Date window
     START = pd.Timestamp(args.start, tz="UTC")
     END   = pd.Timestamp(args.end, tz="UTC")
-    df = df[(df["date_utc"] >= START) & (df["date_utc"] <= END)].copy()
-    print(f"📂 Parsed {len(df)} photometric points in window {START.date()} → {END.date()}")
 
-    # Build pairs
-    pairs = build_color_pairs(df, args.window)
-    if pairs.empty:
-        print("ℹ️ No color pairs found (try increasing --window).")
-        sys.exit(0)
-
-    # State / de-dup
-    state_path = Path(".mpc_color_state.json")
-    if state_path.exists():
-        state = json.loads(state_path.read_text())
-        prev_digest = state.get("digest", "")
+    offset, prefix_hash = resume_offset(state, buf, source, args)
+    if offset is not None:
+        # ---- incremental: parse only the appended bytes ----
+        if offset >= end_ofs:
+            print("✅ No new MPC lines since last run.")
+            return nothing
+        tail = select_photometry(parse_mpc_bytes(buf[offset:end_ofs], obj="0003I", notes="C"))
+        if not tail.empty:
+            tail = tail[(tail["date_utc"] >= START) & (tail["date_utc"] <= END)]
+        print(f"📂 Ingested {end_ofs - offset} new bytes → {len(tail)} photometric points in window")
+
+        nightly = memo["nightly"] if warm else nightly_from_json(state["ingest"]["nightly"])
+        if not tail.empty:
+            fresh = nightly_table(tail)
+            nightly = merge_nightly(nightly, fresh)
+            centers = affected_centers(nightly, fresh["night"], args.window)
+            pairs = pairs_for_centers(nightly, centers, args.window)
+        else:
+            centers = []
+            pairs = pd.DataFrame(columns=PAIR_COLUMNS)
+        recomputed = night_numbers(centers)
+        prefix_hash.update(memoryview(buf)[offset:end_ofs])
+        prefix_digest = prefix_hash.hexdigest()
     else:
-        state = {}
-        prev_digest = ""
-
-    # Only NEW pairs vs last run
-    current_digest = digest_rows(pairs)
-    if current_digest == prev_digest:
+        # ---- full rebuild ----
+        prefix_digest = sha256_bytes(memoryview(buf)[:end_ofs])
+        df = parse_mpc_i3(buf[:end_ofs], digest=prefix_digest)
+        if df.empty:
+            print("⚠️ No usable MPC photometry parsed for 3I/ATLAS.")
+        else:
+            df = df[(df["date_utc"] >= START) & (df["date_utc"] <= END)].copy()
+            print(f"📂 Parsed {len(df)} photometric points in window {START.date()} → {END.date()}")
+
+        # Build pairs (state is saved even without any, so the next run is incremental)
+        nightly = nightly_table(df)
+        pairs = build_color_pairs(df, args.window) if not df.empty else pd.DataFrame(columns=PAIR_COLUMNS)
+        if pairs.empty and not df.empty:
+            print("ℹ️ No color pairs found (try increasing --window).")
+        recomputed = None
+
+    # Diff against the fingerprints of everything reported so far
+    seen = memo["fingerprints"] if warm else fingerprints_from_json(state.get("fingerprints"))
+    keys, colors = fingerprints(pairs)
+    added, changed, was = diff_fingerprints(seen, keys, colors)
+    seen = update_fingerprints(seen, keys, colors, recomputed)
+    # Built on a copy: `state` and `memo` only advance once the CSV and state file are written
+    new_state = {k: v for k, v in state.items() if k != "digest"}   # whole-table hash of older versions
+    new_state["fingerprints"] = fingerprints_to_json(seen)
+
+    new_state["ingest"] = {
+        "source": source,
+        "window": args.window, "start": args.start, "end": args.end,
+        "offset": end_ofs,
+        "prefix_sha256": prefix_digest,
+        "nightly": nightly_to_json(nightly),
+    }
+    new_state["last_run_iso"] = pd.Timestamp.now("UTC").isoformat()
+
+    # Rows not yet in the alerts CSV (exact-colour de-dup) are appended to it
+    out_csv = Path("I3_Color_Alerts.csv")
+    fresh_pairs = new_rows(pairs, out_csv)
+    if not fresh_pairs.empty:
+        if out_csv.exists():
+            prev = pd.read_csv(out_csv, parse_dates=["date_center"])
+            combined = pd.concat([prev, fresh_pairs], ignore_index=True).drop_duplicates(subset=["date_center","pair","color"])
+        else:
+            combined = fresh_pairs
+        combined.sort_values(["date_center","pair"]).to_csv(out_csv, index=False)
+
+    # Save state, then commit it in memory
+    STATE_PATH.write_text(json.dumps(new_state, indent=2))
+    state.clear()
+    state.update(new_state)
+    memo.update(prefix_sha256=prefix_digest, nightly=nightly, fingerprints=seen)
+
+    # Pretty print exactly what was added / changed since the last run
+    report = np.flatnonzero(added | changed)
+    if report.size == 0:
         print("✅ No new color pairs since last run.")
-        sys.exit(0)
+        return nothing
+    print(f"\n🌈 {int(added.sum())} new and {int(changed.sum())} changed color pairs:")
+    lines = [
+        f"  {day}  {pair:>4}  = {color:+.3f} mag  (n={n}, span={span}d)"
+        + (f"  [was {old / FP_COLOR_SCALE:+.3f}]" if ch else "")
+        for day, pair, color, n, span, ch, old in zip(
+            pairs["date_center"].iloc[report].dt.strftime("%Y-%m-%d"),
+            pairs["pair"].iloc[report], pairs["color"].iloc[report],
+            pairs["n_pts"].iloc[report].astype(int), pairs["span_days"].iloc[report].astype(int),
+            changed[report], was[report])
+    ]
+    print("\n".join(lines[-REPORT_LINES:]))
+    if len(lines) > REPORT_LINES:
+        print(f"  … {len(lines) - REPORT_LINES} earlier ones not shown")
+
+    print(f"\n📝 Appended {len(fresh_pairs)} rows to {out_csv.name}")
+    print("💡 Interpretation: more negative g–r or g–o → bluer; more positive → redder.")
+    return pairs.iloc[report]
 
-    # Persist & append CSV
-    out_csv = Path("I3_Color_Alerts.csv")
-    if out_csv.exists():
-        prev = pd.read_csv(out_csv, parse_dates=["date_center"])
-        combined = pd.concat([prev, pairs], ignore_index=True).drop_duplicates(subset=["date_center","pair","color"])
-    else:
-        combined = pairs
 
-    combined.sort_values(["date_center","pair"]).to_csv(out_csv, index=False)
+# ------------------------- Watch daemon -------------------------
+def source_signature(args):
+    """Cheap change marker: (size, mtime, inode) of the file; None for a URL (always fetched)."""
+    if args.url:
+        return None
+    st = Path(args.file).stat()
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+def alert_summary(out_csv: Path) -> str:
+    """Per-pair count / latest / median colour of the alerts CSV."""
+    alerts = pd.read_csv(out_csv, parse_dates=["date_center"]).sort_values("date_center")
+    rows = [f"  {pair:>4}: n={len(g):3d}  latest={g['color'].iloc[-1]:+.3f} ({g['date_center'].iloc[-1]:%Y-%m-%d})"
+            f"  median={g['color'].median():+.3f}"
+            for pair, g in alerts.groupby("pair")]
+    return "\n".join(rows)
+
+def plot_alerts(out_csv: Path, out_png: Path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    alerts = pd.read_csv(out_csv, parse_dates=["date_center"]).sort_values("date_center")
+    fig, ax = plt.subplots(figsize=(10, 4))
+    for pair, g in alerts.groupby("pair"):
+        ax.plot(g["date_center"], g["color"], "o-", ms=3, lw=1, label=pair)
+    ax.set_ylabel("Color (mag)")
+    ax.set_title("3I/ATLAS — color pairs (watch mode)")
+    ax.grid(alpha=0.3)
+    ax.legend()
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(out_png, dpi=150)
+    plt.close(fig)
+
+async def watch(args):
+    """
+    Poll the source every --interval seconds and run a pass only when it
+    changed.  Parsed state stays in memory between passes; blocking work runs
+    in a worker thread so the loop stays responsive to Ctrl-C / SIGTERM.
+    """
+    source = args.url or str(Path(args.file).resolve())
+    out_csv = Path("I3_Color_Alerts.csv")
+    state, memo = load_state(), {}
+    last_sig = last_digest = None
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass                                   # e.g. Windows: Ctrl-C raises instead
+
+    print(f"👀 Watching {source} every {args.interval:g}s (Ctrl-C to stop)")
+    while not stop.is_set():
+        try:
+            sig = await asyncio.to_thread(source_signature, args)
+            if sig is None or sig != last_sig:
+                buf = await asyncio.to_thread(load_bytes, args)
+                digest = sha256_bytes(buf)
+                if digest != last_digest:
+                    print(f"\n🔔 {pd.Timestamp.now('UTC'):%Y-%m-%d %H:%M:%S} source changed ({len(buf)} bytes)")
+                    report = await asyncio.to_thread(run_pass, buf, state, source, args, memo)
+                    if not report.empty and out_csv.exists():
+                        print("\n📊 Alert summary:\n" + await asyncio.to_thread(alert_summary, out_csv))
+                        if args.plot:
+                            await asyncio.to_thread(plot_alerts, out_csv, Path(args.plot))
+                            print(f"🖼️  Refreshed {args.plot}")
+                last_sig, last_digest = sig, digest
+        except Exception as e:
+            print(f"⚠️ Watch pass failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=args.interval)
+        except asyncio.TimeoutError:
+            pass
+    print("👋 Watcher stopped.")
 
-    # Save state
-    state["digest"] = current_digest
-    state["last_run_iso"] = pd.Timestamp.utcnow().isoformat()
-    state_path.write_text(json.dumps(state, indent=2))
+# ------------------------- Main -------------------------
+def main():
+    args = get_args()
+    if args.watch:
+        asyncio.run(watch(args))
+        return
 
-    # Pretty print NEW content (last few rows)
-    print("\n🌈 New color pairs detected (latest):")
-    latest = pairs.tail(10).copy()
-    latest["date_center"] = latest["date_center"].dt.strftime("%Y-%m-%d")
-    for _, r in latest.iterrows():
-        print(f"  {r['date_center']}  {r['pair']:>4}  = {r['color']:+.3f} mag  "
-              f"(n={int(r['n_pts'])}, span={int(r['span_days'])}d)")
+    # Load MPC
+    try:
+        buf = load_bytes(args)
+    except Exception as e:
+        print(f"❌ Unable to load MPC text: {e}")
+        sys.exit(1)
 
-    print(f"\n📝 Appended to {out_csv.name}")
-    print("💡 Interpretation: more negative g–r or g–o → bluer; more positive → redder.")
+    source = args.url or str(Path(args.file).resolve())
+    run_pass(buf, load_state(), source, args)
 
 if __name__ == "__main__":
     main()
@@ -11,6 +11,8 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import re
 
+from mpc_parser import mpc_date_to_timestamp
+
 FILTERS = ["g", "r", "o", "v", "c"]
 COMBOS = [("g", "r"), ("g", "o"), ("r", "o")]
 SOLAR_COLORS = {"g-r": 0.44, "g-o": 0.62, "r-o": 0.18}
@@ -19,12 +21,6 @@ PERIHELION = pd.Timestamp("2025-10-29", tz="UTC")
 # ------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------
-def fractional_day_to_datetime(year, month, day_frac):
-    day_int = int(day_frac)
-    frac = day_frac - day_int
-    base = pd.Timestamp(f"{year}-{month:02d}-{day_int:02d}", tz="UTC")
-    return base + pd.to_timedelta(frac * 24, unit="h")
-
 def parse_mpc(path="I3.txt"):
     lines = Path(path).read_text().splitlines()
     data = []
@@ -41,11 +37,12 @@ def parse_mpc(path="I3.txt"):
         mag = float(magm[1])
         flt = magm[2].lower()
         data.append({
-            "date": fractional_day_to_datetime(y, mth, d),
+            "year": y, "month": mth, "day": d,
             "mag": mag,
             "filter": flt
         })
     df = pd.DataFrame(data)
+    df.insert(0, "date", mpc_date_to_timestamp(df.pop("year"), df.pop("month"), df.pop("day")))
     df["night"] = df["date"].dt.floor("D")
     return df
 
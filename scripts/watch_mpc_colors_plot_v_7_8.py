@@ -14,6 +14,8 @@ import matplotlib.dates as mdates
 from pathlib import Path
 import re
 
+from mpc_parser import mpc_date_to_timestamp
+
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
@@ -26,13 +28,6 @@ PERIHELION = pd.Timestamp("2025-10-29", tz="UTC")
 # ------------------------------------------------------------
 # Utilities
 # ------------------------------------------------------------
-def fractional_day_to_datetime(year, month, day_frac):
-    """Convert MPC fractional day to UTC datetime."""
-    day_int = int(day_frac)
-    frac = day_frac - day_int
-    base = pd.Timestamp(f"{year}-{month:02d}-{day_int:02d}", tz="UTC")
-    return base + pd.to_timedelta(frac * 24, unit="h")
-
 def parse_mpc(path="I3.txt"):
     """Parse MPC photometry for object 3I/ATLAS."""
     lines = Path(path).read_text().splitlines()
@@ -49,9 +44,10 @@ def parse_mpc(path="I3.txt"):
             continue
         mag = float(magm[1])
         flt = magm[2].lower()
-        data.append({"date": fractional_day_to_datetime(y, mth, d),
+        data.append({"year": y, "month": mth, "day": d,
                      "mag": mag, "filter": flt})
     df = pd.DataFrame(data)
+    df.insert(0, "date", mpc_date_to_timestamp(df.pop("year"), df.pop("month"), df.pop("day")))
     df["night"] = df["date"].dt.floor("D")
     return df
 
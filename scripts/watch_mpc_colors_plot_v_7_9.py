@@ -17,6 +17,8 @@ import re
 import hashlib
 from datetime import datetime, timezone
 
+from mpc_parser import mpc_date_to_timestamp
+
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
@@ -29,13 +31,6 @@ PERIHELION = pd.Timestamp("2025-10-29", tz="UTC")
 # ------------------------------------------------------------
 # Utility Functions
 # ------------------------------------------------------------
-def fractional_day_to_datetime(year, month, day_frac):
-    """Convert MPC fractional day to UTC datetime."""
-    day_int = int(day_frac)
-    frac = day_frac - day_int
-    base = pd.Timestamp(f"{year}-{month:02d}-{day_int:02d}", tz="UTC")
-    return base + pd.to_timedelta(frac * 24, unit="h")
-
 def file_sha256(path):
     """Compute SHA-256 checksum of a file."""
     h = hashlib.sha256()
@@ -60,9 +55,10 @@ def parse_mpc(path="I3.txt"):
             continue
         mag = float(magm[1])
         flt = magm[2].lower()
-        data.append({"date": fractional_day_to_datetime(y, mth, d),
+        data.append({"year": y, "month": mth, "day": d,
                      "mag": mag, "filter": flt})
     df = pd.DataFrame(data)
+    df.insert(0, "date", mpc_date_to_timestamp(df.pop("year"), df.pop("month"), df.pop("day")))
     df["night"] = df["date"].dt.floor("D")
     return df
 
@@ -19,9 +19,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from pathlib import Path
-import re, hashlib
+import hashlib
 from datetime import datetime, timezone
 
+from alert_store import AlertStore
+from color_pairs import color_pairs
+from mpc_parser import NS_PER_DAY
+from obs_store import ObsStore
+
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
@@ -49,45 +54,25 @@ def sha256sum(path):
             h.update(chunk)
     return h.hexdigest()
 
-def fractional_day_to_datetime(year, month, day_frac):
-    day_int = int(day_frac)
-    frac = day_frac - day_int
-    base = pd.Timestamp(f"{year}-{month:02d}-{day_int:02d}", tz="UTC")
-    return base + pd.to_timedelta(frac * 24, unit="h")
-
 def parse_mpc(path="I3.txt"):
-    lines = Path(path).read_text().splitlines()
-    data = []
-    for line in lines:
-        if not line.startswith("0003I") or not re.search(r"C2025", line):
-            continue
-        m = re.search(r"C(2025)\s(\d{2})\s(\d{2}\.\d+)", line)
-        if not m:
-            continue
-        y, mth, d = int(m[1]), int(m[2]), float(m[3])
-        magm = re.search(r"(\d{2}\.\d{2})([A-Za-z])", line)
-        if not magm:
-            continue
-        mag = float(magm[1])
-        flt = magm[2].lower()
-        data.append({"date": fractional_day_to_datetime(y, mth, d),
-                     "mag": mag, "filter": flt})
-    df = pd.DataFrame(data)
-    df["night"] = df["date"].dt.floor("D")
-    return df
-
-def build_pairs(df, window_days=1):
-    tol = pd.Timedelta(days=window_days)
-    pairs = []
-    for night in df["night"].unique():
-        sub = df[(df["night"] >= night - tol) & (df["night"] <= night + tol)]
-        for f1, f2 in COMBOS:
-            m1 = sub[sub["filter"] == f1]["mag"].mean()
-            m2 = sub[sub["filter"] == f2]["mag"].mean()
-            if np.isnan(m1) or np.isnan(m2):
-                continue
-            pairs.append({"date": night, "pair": f"{f1}-{f2}", "color": m1 - m2})
-    return pd.DataFrame(pairs)
+    store = ObsStore.from_mpc_file(path, obj="0003I", notes="C")
+    in_2025 = (store.t >= pd.Timestamp("2025-01-01").value) & (store.t < pd.Timestamp("2026-01-01").value)
+    # Magnitudes given to 0.01 mag only (the selection the regex parser made)
+    return store.select(~np.isnan(store.mag) & (store.mag_dec == 2) & in_2025).map_bands(str.lower)
+
+def night_timestamps(nights):
+    return pd.to_datetime(np.asarray(nights) * NS_PER_DAY, utc=True)
+
+def build_pairs(store, window_days=1):
+    """Colour of every night from all observations within ±window_days (color_pairs engine)."""
+    nightly = store.index("band", "night")
+    # centre nights in order of first appearance, as the per-night loop emitted them
+    first = np.unique(store.night, return_index=True)[1]
+    pairs = color_pairs(nightly.keys["night"], store.bands[nightly.keys["band"]],
+                        nightly.sum(store.mag64), nightly.counts, store.night[np.sort(first)],
+                        window_days, COMBOS, mean="obs")
+    return pd.DataFrame({"date": night_timestamps(pairs["center"]),
+                         "pair": pairs["pair"], "color": pairs["color"]})
 
 # ------------------------------------------------------------
 # Analysis + Proof
@@ -143,7 +128,7 @@ def analyze_color_differences(pairs, perihelion, source_file, tag):
 # ------------------------------------------------------------
 # Plot (dual-panel: color + brightness)
 # ------------------------------------------------------------
-def plot_colors_and_brightness(pairs, df, tag):
+def plot_colors_and_brightness(pairs, store, tag):
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(9, 7), sharex=True,
                                    gridspec_kw={'height_ratios':[3,2]})
     # --- COLOR EVOLUTION ---
@@ -166,10 +151,13 @@ def plot_colors_and_brightness(pairs, df, tag):
     ax1.legend()
 
     # --- BRIGHTNESS TIMELINE ---
+    nightly = store.index("band", "night")
+    nightly_mag = nightly.mean(store.mag64)
     for f in ["g","r","o"]:
-        sub = df[df["filter"] == f].groupby("night")["mag"].mean().reset_index()
-        if not sub.empty:
-            ax2.plot(sub["night"], sub["mag"], "o-", color=COLORS[f], label=f"{f}-band")
+        sel = nightly.keys["band"] == store.band_code(f)
+        if sel.any():
+            ax2.plot(night_timestamps(nightly.keys["night"][sel]), nightly_mag[sel], "o-",
+                     color=COLORS[f], label=f"{f}-band")
     ax2.axvline(PERIHELION, color="magenta", linestyle="--", linewidth=1.0)
     ax2.set_ylabel("Mean Brightness (mag)")
     ax2.invert_yaxis()
@@ -192,7 +180,7 @@ def plot_colors_and_brightness(pairs, df, tag):
 # ------------------------------------------------------------
 # Proof Manifest
 # ------------------------------------------------------------
-def write_proof_manifest(source_file, sha_in, stats_file, pairs_file, plot_file, tag):
+def write_proof_manifest(source_file, sha_in, stats_file, pairs_file, pairs_run, plot_file, tag):
     timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     manifest = Path(f"I3_Color_Proof_{tag}.txt")
     with open(manifest, "w") as f:
@@ -204,6 +192,8 @@ def write_proof_manifest(source_file, sha_in, stats_file, pairs_file, plot_file,
         for file in [stats_file, pairs_file, plot_file]:
             if Path(file).exists():
                 f.write(f"{file}\t{sha256sum(file)}\n")
+        label, digest = pairs_run
+        f.write(f"{label}\t{digest}\n")
         f.write("\nTo verify integrity:\n")
         f.write(f" ots stamp I3_Color_Proof_{tag}.txt\n ots verify I3_Color_Proof_{tag}.txt.ots\n")
     print(f"🔏 Proof manifest created: I3_Color_Proof_{tag}.txt")
@@ -214,14 +204,20 @@ def write_proof_manifest(source_file, sha_in, stats_file, pairs_file, plot_file,
 if __name__ == "__main__":
     tag = utc_tag()
     src = "I3.txt"
-    df = parse_mpc(src)
-    df = df[(df["date"] >= "2025-07-01") & (df["date"] <= "2025-12-31")]
-
-    pairs = build_pairs(df, window_days=1)
-    pairs_path = f"I3_Color_Alerts_{tag}.csv"
-    pairs.to_csv(pairs_path, index=False)
-    print(f"✅ Saved {len(pairs)} color pairs → {pairs_path}")
+    store = parse_mpc(src)
+    store = store.select((store.t >= pd.Timestamp("2025-07-01").value) &
+                         (store.t <= pd.Timestamp("2025-12-31").value))
 
+    pairs = build_pairs(store, window_days=1)
     stats, stats_path, sha_in = analyze_color_differences(pairs, PERIHELION, src, tag)
-    plot_path = plot_colors_and_brightness(pairs, df, tag)
-    write_proof_manifest(src, sha_in, stats_path, pairs_path, plot_path, tag)
+
+    # One run of the append-only alert store, exported as the timestamped CSV the shell scripts read
+    alerts = AlertStore()
+    run_id = alerts.append(pairs, tag=tag, source_sha256=sha_in)
+    run = alerts.run(run_id)
+    pairs_path = alerts.export(run_id)
+    print(f"✅ Saved {len(pairs)} color pairs → {alerts.path} run {run_id}, {pairs_path}")
+
+    plot_path = plot_colors_and_brightness(pairs, store, tag)
+    write_proof_manifest(src, sha_in, stats_path, pairs_path, (f"{alerts.path}#run={run_id}", run["sha256"]),
+                         plot_path, tag)